@@ -0,0 +1,279 @@
+"""
+Egyptian Telecom Analytics - Query API
+Serves the run_analytics results as JSON over a local async HTTP API
+Usage: python analytics_api.py [port]
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlsplit, parse_qsl
+
+import pyarrow as pa
+
+from connection_pool import ReadOnlyConnectionPool
+from database_manager import TelecomAnalytics
+
+# URL path -> TelecomAnalytics query name
+ENDPOINTS = {
+    '/api/operator-ranking': 'operator_ranking',
+    '/api/category-breakdown': 'category_breakdown',
+    '/api/governorate-analysis': 'governorate_analysis',
+    '/api/weekly-trends': 'weekly_trends',
+}
+FILTERS = ('operator', 'governorate', 'start_date', 'end_date', 'limit')
+FORMATS = ('json', 'ndjson', 'arrow')
+STREAM_BATCH_ROWS = 10_000
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_filters(query_string, name):
+    """Validate query-string filters for the named analysis and return (filters, format)"""
+    
+    params = dict(parse_qsl(query_string))
+    response_format = params.pop('format', 'json')
+    if response_format not in FORMATS:
+        raise HTTPError(400, f"format must be one of {', '.join(FORMATS)}")
+    
+    unknown = set(params) - set(FILTERS)
+    if unknown:
+        raise HTTPError(400, f"Unknown filters: {', '.join(sorted(unknown))}")
+    unsupported = set(params) - set(TelecomAnalytics.QUERY_FILTERS[name])
+    if unsupported:
+        raise HTTPError(400, f"Filters not supported by this endpoint: {', '.join(sorted(unsupported))}")
+    
+    filters = {}
+    for filter_name, value in params.items():
+        try:
+            if filter_name in ('start_date', 'end_date'):
+                filters[filter_name] = date.fromisoformat(value)
+            elif filter_name == 'limit':
+                filters[filter_name] = int(value)
+                if filters[filter_name] < 1:
+                    raise ValueError
+            else:
+                filters[filter_name] = value
+        except ValueError:
+            raise HTTPError(400, f"Invalid value for {filter_name}: {value}")
+    
+    return filters, response_format
+
+
+class ChunkSink:
+    """File-like sink for the Arrow IPC writer that hands out what was written since the last drain"""
+    
+    closed = False
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class AnalyticsAPIServer:
+    """Async HTTP API over the published warehouse snapshot.
+    
+    Queries run on worker threads, each on its own cursor from the read-only
+    pool. Responses carry an ETag derived from the snapshot (data version) and
+    the request, so clients can revalidate with If-None-Match; JSON bodies are
+    cached until a new snapshot is published. ndjson and arrow formats are
+    streamed batch by batch with chunked transfer encoding.
+    """
+    
+    def __init__(self, db_path='egypt_telecom.duckdb', host='127.0.0.1', port=8600,
+                 max_workers=8, cache_size=256):
+        self.host = host
+        self.port = port
+        self.pool = ReadOnlyConnectionPool(db_path)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._server = None
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+    
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"🚀 Analytics API listening on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+    
+    async def _handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            try:
+                method, target, _ = request_line.split(' ', 2)
+            except ValueError:
+                raise HTTPError(400, "Malformed request line")
+            if method != 'GET':
+                raise HTTPError(405, "Only GET is supported")
+            
+            await self._handle_request(writer, target, headers)
+        
+        except HTTPError as e:
+            await self._send(writer, e.status, self._json_body({'error': str(e)}))
+        except Exception as e:
+            await self._send(writer, 500, self._json_body({'error': str(e)}))
+        finally:
+            writer.close()
+    
+    async def _handle_request(self, writer, target, headers):
+        url = urlsplit(target)
+        loop = asyncio.get_running_loop()
+        
+        if url.path == '/api/status':
+            data_version = os.path.basename(await loop.run_in_executor(self.executor, lambda: self.pool.snapshot))
+            await self._send(writer, 200, self._json_body({'data_version': data_version,
+                                                           'endpoints': sorted(ENDPOINTS)}))
+            return
+        
+        if url.path not in ENDPOINTS:
+            raise HTTPError(404, f"Unknown endpoint: {url.path}")
+        
+        name = ENDPOINTS[url.path]
+        filters, response_format = parse_filters(url.query, name)
+        
+        # The data version and the cursor answering the request come from one look at the
+        # pointer, so a publish in between can't put new rows under the old version's ETag
+        cursor, snapshot = await loop.run_in_executor(self.executor, self.pool.new_cursor)
+        try:
+            await self._respond(writer, cursor, os.path.basename(snapshot), name, filters, response_format, headers)
+        finally:
+            cursor.close()
+    
+    async def _respond(self, writer, cursor, data_version, name, filters, response_format, headers):
+        loop = asyncio.get_running_loop()
+        cache_key = (data_version, name, response_format, tuple(sorted(filters.items())))
+        etag = '"' + hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest() + '"'
+        extra_headers = {'ETag': etag, 'X-Data-Version': data_version}
+        
+        if headers.get('if-none-match') == etag:
+            await self._send(writer, 304, b'', extra_headers=extra_headers)
+            return
+        
+        if response_format == 'json':
+            body = self._cache.get(cache_key)
+            if body is None:
+                df = await loop.run_in_executor(
+                    self.executor, lambda: TelecomAnalytics(cursor).fetch(name, **filters))
+                body = self._json_body({'analysis': name, 'data_version': data_version,
+                                        'rows': json.loads(df.to_json(orient='records', date_format='iso'))})
+                self._remember(cache_key, body)
+            else:
+                self._cache.move_to_end(cache_key)
+            await self._send(writer, 200, body, extra_headers=extra_headers)
+            return
+        
+        await self._stream(writer, cursor, name, filters, response_format, extra_headers)
+    
+    async def _stream(self, writer, cursor, name, filters, response_format, extra_headers):
+        """Stream a result as NDJSON lines or an Arrow IPC stream, one batch at a time"""
+        
+        loop = asyncio.get_running_loop()
+        
+        def open_reader():
+            sql, params = TelecomAnalytics(cursor).query(name, **filters)
+            return cursor.execute(sql, params).fetch_record_batch(STREAM_BATCH_ROWS)
+        
+        batches = await loop.run_in_executor(self.executor, open_reader)
+        content_type = 'application/x-ndjson' if response_format == 'ndjson' else 'application/vnd.apache.arrow.stream'
+        headers = dict(extra_headers, **{'Content-Type': content_type, 'Transfer-Encoding': 'chunked'})
+        writer.write(self._head(200, headers))
+        
+        sink = ChunkSink()
+        ipc_writer = pa.ipc.new_stream(sink, batches.schema) if response_format == 'arrow' else None
+        
+        def next_chunk():
+            try:
+                batch = batches.read_next_batch()
+            except StopIteration:
+                return None
+            if ipc_writer is None:
+                return batch.to_pandas().to_json(orient='records', lines=True, date_format='iso').encode('utf-8')
+            ipc_writer.write_batch(batch)
+            return sink.drain()
+        
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next_chunk)
+                if chunk is None:
+                    break
+                await self._write_chunk(writer, chunk)
+            
+            if ipc_writer is not None:
+                ipc_writer.close()
+                await self._write_chunk(writer, sink.drain())
+            writer.write(b'0\r\n\r\n')
+            await writer.drain()
+        except Exception as e:
+            # Headers are already sent; dropping the connection without the final chunk marks the body incomplete
+            print(f"❌ Error streaming {name}: {e}")
+    
+    async def _write_chunk(self, writer, chunk):
+        if chunk:
+            writer.write(f"{len(chunk):X}\r\n".encode('ascii') + chunk + b'\r\n')
+            await writer.drain()
+    
+    def _remember(self, cache_key, body):
+        self._cache[cache_key] = body
+        # Entries for older data versions simply age out of the LRU
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def _json_body(self, payload):
+        return json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    
+    def _head(self, status, headers):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", 'Connection: close']
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    
+    async def _send(self, writer, status, body, extra_headers=None):
+        headers = {'Content-Type': 'application/json; charset=utf-8', 'Content-Length': str(len(body))}
+        headers.update(extra_headers or {})
+        writer.write(self._head(status, headers) + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8600
+    try:
+        asyncio.run(AnalyticsAPIServer(port=port).serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 Analytics API stopped")
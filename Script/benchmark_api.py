@@ -0,0 +1,88 @@
+"""
+Load test for the analytics query API
+Runs the API in-process against the published database and reports latency percentiles
+Usage: python benchmark_api.py [concurrency] [requests_per_client]
+"""
+
+import asyncio
+import http.client
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analytics_api import AnalyticsAPIServer, ENDPOINTS
+
+OPERATORS = [None, 'vodafone', 'orange', 'etisalat', 'we']
+
+
+def start_server():
+    """Start the API on an ephemeral port in a background event loop"""
+    
+    server = AnalyticsAPIServer(port=0)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+    
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server
+
+
+def client(port, num_requests, revalidate, seed):
+    """Issue requests over a random endpoint/filter mix and return their latencies"""
+    
+    rng = random.Random(seed)
+    etags = {}
+    latencies = []
+    for _ in range(num_requests):
+        path = rng.choice(list(ENDPOINTS))
+        operator = rng.choice(OPERATORS)
+        target = path + (f"?operator={operator}" if operator else "")
+        headers = {'If-None-Match': etags[target]} if revalidate and target in etags else {}
+        
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', target, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        latencies.append(time.perf_counter() - start)
+        
+        if response.status not in (200, 304):
+            raise RuntimeError(f"{target} returned {response.status}")
+        etags[target] = response.getheader('ETag')
+    
+    return latencies
+
+
+def run_load_test(concurrency=32, requests_per_client=50):
+    server = start_server()
+    print(f"🚀 API on port {server.port}, data version {server.pool.snapshot}")
+    
+    for label, revalidate in (("Cached JSON", False), ("ETag revalidation", True)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda seed: client(server.port, requests_per_client, revalidate, seed),
+                                    range(concurrency)))
+        elapsed = time.perf_counter() - start
+        
+        latencies = sorted(latency for result in results for latency in result)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+        
+        print(f"\n📈 {label}: {len(latencies)} requests, {concurrency} concurrent clients")
+        print(f"Throughput: {len(latencies) / elapsed:.0f} req/s")
+        print(f"p50: {percentile(50):.1f} ms  p95: {percentile(95):.1f} ms  p99: {percentile(99):.1f} ms")
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run_load_test(concurrency, requests_per_client)
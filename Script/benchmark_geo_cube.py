@@ -0,0 +1,74 @@
+"""
+Check the incremental geo cube refresh against a full rebuild, and time both
+Usage: python benchmark_geo_cube.py [num_complaints] [corrected_rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+
+from benchmark_validation import synthetic_complaints
+from database_manager import TelecomDatabase
+
+
+def build_snapshot(tmp_dir, complaints_df):
+    db = TelecomDatabase(os.path.join(tmp_dir, 'egypt_telecom.duckdb'), os.path.join(tmp_dir, 'data_lake'))
+    db.ingest_batch(complaints_df, 'customer_complaints')
+    db.archive_history()
+    return db
+
+
+def run_benchmark(num_complaints=200_000, corrected_rows=100):
+    # A year of complaints up to today, so some weeks stay hot and the rest are archived
+    complaints_df = synthetic_complaints(num_complaints, 0)
+    rng = np.random.default_rng(7)
+    complaints_df['date'] = pd.Timestamp(date.today()) - pd.to_timedelta(rng.integers(0, 365, num_complaints), unit='D')
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = build_snapshot(tmp_dir, complaints_df)
+        db.refresh_geo_cube()
+        db.publish()
+        db.conn.close()
+        
+        # Next load: corrected hot rows (same count and collection time) and a late arrival for an archived week
+        recent = complaints_df.index[complaints_df['date'] >= pd.Timestamp(date.today()) - pd.Timedelta(days=30)]
+        corrected = rng.choice(recent, min(corrected_rows, len(recent)), replace=False)
+        complaints_df.loc[corrected, 'sentiment_score'] = -complaints_df.loc[corrected, 'sentiment_score']
+        late_row = complaints_df.iloc[[0]].assign(complaint_id=num_complaints + 1,
+                                                  date=pd.Timestamp(date.today()) - pd.Timedelta(days=200))
+        complaints_df = pd.concat([complaints_df, late_row], ignore_index=True)
+        print(f"📊 {num_complaints:,} complaints, {len(corrected)} hot rows corrected, 1 late arrival")
+        
+        db = build_snapshot(tmp_dir, complaints_df)
+        start = time.perf_counter()
+        db.refresh_geo_cube()
+        incremental_time = time.perf_counter() - start
+        db.conn.execute("CREATE TEMP TABLE incremental_cube AS SELECT * FROM geo_cube")
+        
+        start = time.perf_counter()
+        db.refresh_geo_cube(full=True)
+        full_time = time.perf_counter() - start
+        
+        mismatched = db.conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM (SELECT * FROM incremental_cube EXCEPT ALL SELECT * FROM geo_cube)),
+                (SELECT COUNT(*) FROM (SELECT * FROM geo_cube EXCEPT ALL SELECT * FROM incremental_cube))
+        """).fetchone()
+        db.discard()
+    
+    print(f"Incremental refresh: {incremental_time:.2f}s, full rebuild: {full_time:.2f}s")
+    if any(mismatched):
+        print(f"❌ Incremental cube differs from the full rebuild: {mismatched[0]:,} extra cells, "
+              f"{mismatched[1]:,} missing cells")
+        sys.exit(1)
+    print("✅ Incremental cube matches the full rebuild")
+
+
+if __name__ == "__main__":
+    num_complaints = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    corrected_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run_benchmark(num_complaints, corrected_rows)
@@ -0,0 +1,40 @@
+"""
+Benchmark what-if rescoring of operator-days with the vectorized scoring spec
+Usage: python benchmark_scoring.py [num_operator_days]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from health_scoring import HealthScorer
+
+
+def run_benchmark(num_operator_days=5_000_000):
+    # Synthetic daily aggregates shaped like load_daily_aggregates output
+    rng = np.random.default_rng(42)
+    daily_df = pd.DataFrame({
+        'operator': pd.Categorical(rng.choice(['vodafone', 'orange', 'etisalat', 'we'], num_operator_days)),
+        'date': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, num_operator_days), unit='D'),
+        'daily_complaints': rng.integers(1, 500, num_operator_days),
+        'avg_sentiment': rng.uniform(-0.8, 0.2, num_operator_days),
+        'avg_likes': rng.uniform(0, 15, num_operator_days),
+        'avg_replies': rng.uniform(0, 5, num_operator_days),
+    })
+    print(f"📊 Rescoring {num_operator_days:,} operator-days")
+    
+    scorer = HealthScorer()
+    for label, what_if in (("Default spec", scorer),
+                           ("What-if spec", scorer.with_weights(daily_complaints=-30, avg_sentiment=40, avg_likes=1,
+                                                                rating_bands=[(85, 'Excellent'), (65, 'Good'), (45, 'Fair')]))):
+        start = time.perf_counter()
+        rescored = what_if.what_if(daily_df)
+        elapsed = time.perf_counter() - start
+        ratings = rescored['performance_rating'].value_counts().to_dict()
+        print(f"{label}: {elapsed:.3f}s ({num_operator_days / elapsed / 1e6:.1f}M operator-days/s) {ratings}")
+
+
+if __name__ == "__main__":
+    num_operator_days = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    run_benchmark(num_operator_days)
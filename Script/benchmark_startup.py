@@ -0,0 +1,73 @@
+"""
+Startup-time benchmark and regression gate
+Runs each entry point under `python -X importtime`, reports import cost and
+fails if a heavy module is imported where it shouldn't be or a budget is exceeded
+Usage: python benchmark_startup.py [repeats] [budget_scale]
+"""
+
+import os
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'duckdb', 'plotly.express', 'streamlit')
+
+# (label, python arguments, modules that must not be imported, import budget in ms)
+STARTUP_CASES = [
+    ("main.py --help", ['main.py', '--help'], HEAVY_MODULES, 150),
+    ("import data_transformer", ['-c', 'import data_transformer'], ('duckdb', 'plotly.express', 'streamlit'), 1500),
+    ("import database_manager", ['-c', 'import database_manager'], ('plotly.express', 'streamlit'), 1500),
+    ("import dashboard_data", ['-c', 'import dashboard_data'], ('plotly.express',), 2500),
+]
+
+
+def measure_imports(python_args):
+    """Run python -X importtime and return {module: (self_us, cumulative_us)} and the total in ms"""
+    
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + python_args, cwd=SCRIPT_DIR,
+                            capture_output=True, text=True, check=True)
+    
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    
+    return modules, sum(self_us for self_us, _ in modules.values()) / 1000
+
+
+def run_benchmark(repeats=3, budget_scale=1.0):
+    failures = []
+    for label, python_args, forbidden, budget_ms in STARTUP_CASES:
+        # Best of several runs, so a busy machine doesn't fail the gate
+        runs = [measure_imports(python_args) for _ in range(repeats)]
+        modules, total_ms = min(runs, key=lambda run: run[1])
+        budget_ms *= budget_scale
+        
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+        print(f"\n⏱️ {label}: {total_ms:.0f} ms of imports (budget {budget_ms:.0f} ms)")
+        for name in heavy:
+            print(f"   {name}: {modules[name][1] / 1000:.0f} ms cumulative")
+        
+        unexpected = [name for name in forbidden if name in modules]
+        if unexpected:
+            failures.append(f"{label} imports {', '.join(unexpected)}")
+        if total_ms > budget_ms:
+            failures.append(f"{label} took {total_ms:.0f} ms, over its {budget_ms:.0f} ms budget")
+    
+    if failures:
+        print("\n❌ Startup regressions:")
+        for failure in failures:
+            print(f"- {failure}")
+        return False
+    
+    print("\n✅ Startup within budget")
+    return True
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    budget_scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    sys.exit(0 if run_benchmark(repeats, budget_scale) else 1)
@@ -0,0 +1,54 @@
+"""
+Benchmark the serial transformer against the parallel process-pool backend
+Usage: python benchmark_transformer.py [num_complaints] [max_workers]
+"""
+
+import os
+import sys
+import time
+import pandas as pd
+
+from data_collector import EgyptianTelecomDataCollector
+from data_transformer import EgyptianTelecomTransformer
+from parallel_transformer import ParallelTelecomTransformer
+
+
+def run_benchmark(num_complaints=1_000_000, max_workers=None):
+    print(f"📊 Generating {num_complaints:,} synthetic complaints...")
+    collector = EgyptianTelecomDataCollector()
+    complaints_df = collector.generate_realistic_complaints(num_complaints)
+    complaints_df['date'] = pd.to_datetime(complaints_df['date'])
+    
+    serial = EgyptianTelecomTransformer()
+    start = time.perf_counter()
+    serial_health = serial.calculate_network_health_metrics(complaints_df.copy())
+    serial_benchmarks = serial.create_operator_benchmarks(complaints_df, serial_health)
+    serial_seconds = time.perf_counter() - start
+    print(f"Serial:   {serial_seconds:.3f}s")
+    
+    parallel = ParallelTelecomTransformer(max_workers=max_workers)
+    start = time.perf_counter()
+    parallel_health, parallel_benchmarks = parallel.calculate_metrics_parallel(complaints_df)
+    parallel_seconds = time.perf_counter() - start
+    print(f"Parallel: {parallel_seconds:.3f}s ({parallel.max_workers} workers, "
+          f"{len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()} CPUs available)")
+    phases = parallel.phase_seconds
+    print(f"  parent prepare {phases['prepare']:.3f}s, workers {phases['workers']:.3f}s, "
+          f"parent merge {phases['merge']:.3f}s")
+    
+    # The parallel backend must reproduce the serial output exactly
+    pd.testing.assert_frame_equal(serial_health, parallel_health, check_exact=True)
+    pd.testing.assert_frame_equal(serial_benchmarks, parallel_benchmarks, check_exact=True)
+    print("✅ Parallel output matches serial output")
+    print(f"🚀 Speedup: {serial_seconds / parallel_seconds:.2f}x")
+    
+    # Only the worker phase scales with the pool; the parent phases bound the speedup
+    serial_fraction = (phases['prepare'] + phases['merge']) / parallel_seconds
+    print(f"Serial parent share: {serial_fraction:.1%} "
+          f"(speedup bound {1 / serial_fraction if serial_fraction else float('inf'):.1f}x with unlimited workers)")
+
+
+if __name__ == "__main__":
+    num_complaints = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    run_benchmark(num_complaints, max_workers)
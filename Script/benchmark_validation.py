@@ -0,0 +1,79 @@
+"""
+Benchmark the ingest validation stage against the insert it guards
+Usage: python benchmark_validation.py [num_complaints] [bad_row_fraction]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from data_validation import check_batch, validate_batch, rejection_summary, KNOWN_OPERATORS, KNOWN_GOVERNORATES
+from database_manager import TelecomDatabase
+
+
+def synthetic_complaints(num_complaints, bad_row_fraction, seed=42):
+    """Complaints shaped like the collector output, with a fraction of rows broken on purpose"""
+    
+    rng = np.random.default_rng(seed)
+    complaints_df = pd.DataFrame({
+        'complaint_id': np.arange(1, num_complaints + 1),
+        'operator': rng.choice(KNOWN_OPERATORS, num_complaints),
+        'complaint_text': rng.choice(['Slow internet', 'No network coverage', 'Incorrect charges on my bill'],
+                                     num_complaints),
+        'complaint_category': rng.choice(['internet', 'network', 'billing'], num_complaints),
+        'sentiment_score': rng.uniform(-1, 1, num_complaints).round(3),
+        'date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, num_complaints), unit='D'),
+        'governorate': rng.choice(KNOWN_GOVERNORATES, num_complaints),
+        'likes': rng.integers(0, 50, num_complaints),
+        'replies': rng.integers(0, 20, num_complaints),
+        'source': 'synthetic',
+        'collection_timestamp': pd.Timestamp('2025-12-31'),
+    })
+    
+    bad = rng.choice(num_complaints, int(num_complaints * bad_row_fraction), replace=False)
+    for offset, (column, value) in enumerate([('sentiment_score', 1.5), ('operator', 'unknown_telecom'),
+                                              ('governorate', 'Atlantis'), ('complaint_id', 1),
+                                              ('date', pd.Timestamp('2099-01-01'))]):
+        complaints_df.loc[bad[offset::5], column] = value
+    return complaints_df
+
+
+def run_benchmark(num_complaints=5_000_000, bad_row_fraction=0.001):
+    complaints_df = synthetic_complaints(num_complaints, bad_row_fraction)
+    print(f"📊 Validating {num_complaints:,} complaints ({bad_row_fraction:.2%} broken)")
+    
+    start = time.perf_counter()
+    check_batch(complaints_df, 'customer_complaints')
+    check_time = time.perf_counter() - start
+    valid_df, quarantine_df = validate_batch(complaints_df, 'customer_complaints')
+    print(f"Checks: {check_time:.2f}s, {len(quarantine_df):,} rows rejected {rejection_summary(quarantine_df)}")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = TelecomDatabase(os.path.join(tmp_dir, 'egypt_telecom.duckdb'), os.path.join(tmp_dir, 'data_lake'))
+        
+        # The previous load path: register the DataFrame and insert, without validation
+        start = time.perf_counter()
+        db.conn.register('valid_df', valid_df)
+        db.conn.execute("INSERT INTO customer_complaints BY NAME SELECT * FROM valid_df")
+        insert_time = time.perf_counter() - start
+        db.conn.unregister('valid_df')
+        db.conn.execute("DELETE FROM customer_complaints")
+        
+        start = time.perf_counter()
+        loaded, _ = db.ingest_batch(complaints_df, 'customer_complaints')
+        ingest_time = time.perf_counter() - start
+        db.conn.close()
+    
+    print(f"Unvalidated DataFrame insert: {insert_time:.2f}s")
+    print(f"Validated ingest: {ingest_time:.2f}s for {loaded:,} rows "
+          f"({num_complaints / ingest_time / 1e6:.2f}M rows/s)")
+    print(f"Checks share of validated ingest: {check_time / ingest_time:.1%}")
+
+
+if __name__ == "__main__":
+    num_complaints = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    bad_row_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
+    run_benchmark(num_complaints, bad_row_fraction)
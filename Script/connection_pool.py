@@ -0,0 +1,214 @@
+import os
+import glob
+import json
+import time
+import threading
+import weakref
+import duckdb
+from datetime import datetime
+
+# The published database is a pointer file naming the current snapshot, e.g.
+#   egypt_telecom.duckdb.current -> egypt_telecom.20251103134825123456.duckdb
+# so the pipeline can build a new snapshot while readers keep querying the old one.
+# The history file lists published snapshots, oldest first, so only those are pruned.
+# A snapshot's file list names the external (lake) files its views read, so they
+# are deleted only once no kept snapshot reads them.
+POINTER_SUFFIX = '.current'
+HISTORY_SUFFIX = '.published'
+FILES_SUFFIX = '.files'
+KEEP_SNAPSHOTS = 2
+
+
+def new_snapshot_path(db_path):
+    """Return a fresh snapshot file path next to db_path"""
+    
+    base, ext = os.path.splitext(db_path)
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    return f"{base}.{version}{ext or '.duckdb'}"
+
+
+def current_snapshot_path(db_path):
+    """Return the snapshot currently published for db_path (db_path itself if none)"""
+    
+    try:
+        with open(db_path + POINTER_SUFFIX, encoding='utf-8') as pointer:
+            snapshot_name = pointer.read().strip()
+    except FileNotFoundError:
+        return db_path
+    
+    return os.path.join(os.path.dirname(db_path), snapshot_name)
+
+
+def published_snapshots(db_path):
+    """Names of the snapshots published for db_path, oldest first"""
+    
+    try:
+        with open(db_path + HISTORY_SUFFIX, encoding='utf-8') as history:
+            return [line.strip() for line in history if line.strip()]
+    except FileNotFoundError:
+        # Pointer written before the history existed: the current snapshot is the only known one
+        current = current_snapshot_path(db_path)
+        return [os.path.basename(current)] if current != db_path else []
+
+
+def snapshot_files(snapshot_path):
+    """External files read by a snapshot's views, grouped by table, or None if it has no file list"""
+    
+    try:
+        with open(snapshot_path + FILES_SUFFIX, encoding='utf-8') as file_list:
+            return json.load(file_list)
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot_files(snapshot_path, files):
+    """Record the external files, grouped by table, that a snapshot's views read"""
+    
+    _write_atomically(snapshot_path + FILES_SUFFIX, [json.dumps(files)])
+
+
+def _listed_files(snapshot_path):
+    return {path for paths in (snapshot_files(snapshot_path) or {}).values() for path in paths}
+
+
+def _write_atomically(path, lines):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as output:
+        output.write(''.join(f"{line}\n" for line in lines))
+    os.replace(tmp_path, path)
+
+
+def publish_snapshot(db_path, snapshot_path):
+    """Atomically point db_path at snapshot_path and drop old published snapshots.
+    
+    Only snapshots in the published history are pruned, so a build that is
+    still running (or one that failed and was left behind) never displaces the
+    previous snapshot that readers may still be on. External files listed
+    by pruned snapshots are deleted unless a kept snapshot lists them too.
+    """
+    
+    name = os.path.basename(snapshot_path)
+    history = [snapshot for snapshot in published_snapshots(db_path) if snapshot != name] + [name]
+    
+    pointer_path = db_path + POINTER_SUFFIX
+    tmp_pointer_path = pointer_path + '.tmp'
+    with open(tmp_pointer_path, 'w', encoding='utf-8') as pointer:
+        pointer.write(name)
+    os.replace(tmp_pointer_path, pointer_path)
+    
+    # Keep the previous snapshot for readers that are still on it
+    directory = os.path.dirname(db_path)
+    kept = history[-KEEP_SNAPSHOTS:]
+    pruned = []
+    for old_snapshot in history[:-KEEP_SNAPSHOTS]:
+        try:
+            if os.path.exists(os.path.join(directory, old_snapshot)):
+                os.remove(os.path.join(directory, old_snapshot))
+            pruned.append(old_snapshot)
+        except OSError:
+            # Still open by a reader (Windows); it is removed on a later publish
+            kept.insert(0, old_snapshot)
+    _write_atomically(db_path + HISTORY_SUFFIX, kept)
+    
+    kept_files = set()
+    for snapshot in kept:
+        kept_files |= _listed_files(os.path.join(directory, snapshot))
+    for old_snapshot in pruned:
+        old_path = os.path.join(directory, old_snapshot)
+        for path in _listed_files(old_path) - kept_files:
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(old_path + FILES_SUFFIX):
+            os.remove(old_path + FILES_SUFFIX)
+
+
+def discard_snapshot(snapshot_path):
+    """Remove a snapshot build that was never published"""
+    
+    for path in (snapshot_path, snapshot_path + '.wal', snapshot_path + FILES_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ReadOnlyConnectionPool:
+    """Read-only DuckDB connections to the published snapshot, one cursor per thread.
+    
+    Every thread (a Streamlit session runs its script in its own thread) gets
+    its own cursor on a shared read-only database instance, so sessions query
+    concurrently instead of serializing on one connection. When the pipeline
+    publishes a new snapshot, the next cursor() call switches to it. The
+    superseded instance is closed once no cursor handed out on it is left.
+    """
+    
+    def __init__(self, db_path='egypt_telecom.duckdb', check_interval=1.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        # Reentrant: a cursor's finalizer may run during garbage collection inside a locked section
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._conn = None
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._leases = {}   # snapshot -> cursors handed out on it that are still alive
+        self._retired = {}  # superseded snapshot -> connection kept open for its cursors
+    
+    def _current_connection(self):
+        """Return the shared connection, reopening it if a new snapshot was published"""
+        
+        with self._lock:
+            now = time.monotonic()
+            if self._conn is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                snapshot = current_snapshot_path(self.db_path)
+                if snapshot != self._snapshot:
+                    # Snapshot paths are unique, so this opens a new database instance
+                    conn = duckdb.connect(snapshot, read_only=True)
+                    if self._conn is not None:
+                        self._retire(self._snapshot, self._conn)
+                    self._conn = conn
+                    self._snapshot = snapshot
+            return self._conn, self._snapshot
+    
+    def _retire(self, snapshot, conn):
+        if self._leases.get(snapshot):
+            self._retired[snapshot] = conn
+        else:
+            conn.close()
+    
+    def _release(self, snapshot):
+        with self._lock:
+            self._leases[snapshot] -= 1
+            if self._leases[snapshot] == 0:
+                del self._leases[snapshot]
+                retired = self._retired.pop(snapshot, None)
+                if retired is not None:
+                    retired.close()
+    
+    def new_cursor(self):
+        """Return a dedicated cursor and the snapshot it reads, taken from one look at the pointer.
+        
+        The snapshot's database stays open for as long as the cursor is referenced.
+        """
+        
+        with self._lock:
+            conn, snapshot = self._current_connection()
+            cursor = conn.cursor()
+            self._leases[snapshot] = self._leases.get(snapshot, 0) + 1
+        weakref.finalize(cursor, self._release, snapshot)
+        return cursor, snapshot
+    
+    def cursor(self):
+        """Return this thread's cursor on the current snapshot"""
+        
+        snapshot = self.snapshot
+        local = self._local
+        if getattr(local, 'snapshot', None) != snapshot:
+            # Dropping the old cursor releases its snapshot
+            local.cursor, local.snapshot = self.new_cursor()
+        return local.cursor
+    
+    @property
+    def snapshot(self):
+        """Path of the snapshot the pool is currently serving"""
+        
+        return self._current_connection()[1]
@@ -0,0 +1,208 @@
+import os
+import glob
+import shutil
+from datetime import datetime
+
+# Tables archived to the lake; each is Hive-partitioned as <table>/month=YYYY-MM/operator=<name>/
+ARCHIVED_TABLES = ('customer_complaints', 'network_health_daily')
+
+
+class TelecomDataLake:
+    """Hive-partitioned Parquet archive for cold complaint and health history.
+    
+    Lake files are never changed or removed in place. A snapshot build starts
+    from the file set of the published snapshot, writes new files and drops
+    the ones they supersede from its own set, and its history views list
+    exactly that set. Snapshots still being read keep seeing their own files;
+    superseded files are deleted by publish_snapshot once no kept snapshot
+    lists them.
+    """
+    
+    def __init__(self, lake_path='data_lake', files=None):
+        # Absolute, because the file lists are stored in snapshots opened from any directory
+        self.lake_path = os.path.abspath(lake_path)
+        if files is None:
+            # No file list to start from (first run, or a lake from before file lists): adopt what is on disk
+            files = {table: glob.glob(os.path.join(self.table_path(table), 'month=*', 'operator=*', '*.parquet'))
+                     for table in ARCHIVED_TABLES}
+        self._files = {table: sorted(paths) for table, paths in files.items() if paths}
+        self.written = []
+    
+    def table_path(self, table):
+        return os.path.join(self.lake_path, table)
+    
+    def files(self, table, months=None):
+        """Lake files of table in this build, optionally only those of the given 'YYYY-MM' months"""
+        
+        paths = self._files.get(table, [])
+        if months is None:
+            return list(paths)
+        months = set(months)
+        return [path for path in paths if self._month(path) in months]
+    
+    def manifest(self):
+        """File set of this build, per table"""
+        
+        return {table: list(paths) for table, paths in self._files.items()}
+    
+    @staticmethod
+    def _month(path):
+        return os.path.basename(os.path.dirname(os.path.dirname(path)))[len('month='):]
+    
+    def relation(self, table, months=None):
+        """SQL relation scanning the archived table (or just the given months), or None if it has no files"""
+        
+        paths = self.files(table, months)
+        if not paths:
+            return None
+        
+        file_list = ', '.join(f"'{path.replace(os.sep, '/')}'" for path in paths)
+        return f"read_parquet([{file_list}], hive_partitioning=true)"
+    
+    def _add_files(self, table, staging_path, replaced_partitions=()):
+        """Move staged partition files into the lake under new names and swap them into this build's file set"""
+        
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        staged_partitions = {}
+        for staged_file in glob.glob(os.path.join(staging_path, 'month=*', 'operator=*', '*.parquet')):
+            partition = os.path.relpath(os.path.dirname(staged_file), staging_path)
+            staged_partitions.setdefault(partition, []).append(staged_file)
+        
+        replaced = {os.path.join(self.table_path(table), partition)
+                    for partition in set(staged_partitions) | set(replaced_partitions)}
+        paths = [path for path in self._files.get(table, []) if os.path.dirname(path) not in replaced]
+        for partition, staged_files in staged_partitions.items():
+            target_dir = os.path.join(self.table_path(table), partition)
+            os.makedirs(target_dir, exist_ok=True)
+            for index, staged_file in enumerate(staged_files):
+                path = os.path.join(target_dir, f"part-{run_id}-{index}.parquet")
+                os.replace(staged_file, path)
+                paths.append(path)
+                self.written.append(path)
+        shutil.rmtree(staging_path, ignore_errors=True)
+        
+        self._files[table] = sorted(paths)
+    
+    def _staging_path(self, table):
+        staging_path = os.path.join(self.lake_path, f".staging_{table}_{os.getpid()}")
+        shutil.rmtree(staging_path, ignore_errors=True)
+        os.makedirs(self.lake_path, exist_ok=True)
+        return staging_path
+    
+    def archive(self, conn, table, before_date, keys):
+        """Write rows of table older than before_date to the lake.
+        
+        Rows already archived unchanged are skipped. Every partition that gets
+        a new or changed row (a late arrival, a corrected value) is rewritten
+        with the table's version of each key replacing the archived one, so a
+        row is neither lost nor duplicated however late it arrives. Only the
+        months of those rows are read from the lake. Afterwards every row of
+        table older than before_date is in this build's lake files.
+        Returns the number of rows written.
+        """
+        
+        months = self.months_before(conn, table, before_date)
+        if not months:
+            return 0
+        
+        columns = ', '.join(column[0] for column in conn.execute(f"SELECT * FROM {table} LIMIT 0").description)
+        key_match = ' AND '.join(f"archived.{key} = hot.{key}" for key in keys)
+        relation = self.relation(table, months)
+        
+        # New or changed rows: older than before_date and not identical to an archived row
+        archived_rows = f"EXCEPT SELECT {columns} FROM {relation} WHERE date < ?" if relation else ""
+        params = [before_date] + ([before_date] if relation else [])
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE lake_pending AS
+            SELECT {columns} FROM {table} WHERE date < ?
+            {archived_rows}
+        """, params)
+        row_count = conn.execute("SELECT COUNT(*) FROM lake_pending").fetchone()[0]
+        if row_count == 0:
+            conn.execute("DROP TABLE lake_pending")
+            return 0
+        
+        # Partitions to rewrite: those of the pending rows and those holding an older version of them
+        superseded = f"""
+            UNION
+            SELECT DISTINCT month, operator FROM {relation} archived
+            WHERE EXISTS (SELECT 1 FROM lake_pending hot WHERE {key_match})
+        """ if relation else ""
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE lake_partitions AS
+            SELECT DISTINCT strftime(date, '%Y-%m') AS month, operator FROM lake_pending
+            {superseded}
+        """)
+        partitions = [f"month={month}{os.sep}operator={operator}"
+                      for month, operator in conn.execute("SELECT month, operator FROM lake_partitions").fetchall()]
+        
+        kept_rows = f"""
+            UNION ALL BY NAME
+            SELECT archived.* FROM {relation} archived
+            JOIN lake_partitions USING (month, operator)
+            WHERE NOT EXISTS (SELECT 1 FROM {table} hot WHERE hot.date < ? AND {key_match})
+        """ if relation else ""
+        
+        # Write the rewritten partitions in one scan into a staging directory
+        staging_path = self._staging_path(table)
+        conn.execute(f"""
+            COPY (
+                SELECT hot.* FROM (SELECT *, strftime(date, '%Y-%m') AS month FROM {table} WHERE date < ?) hot
+                JOIN lake_partitions USING (month, operator)
+                {kept_rows}
+            ) TO '{staging_path.replace(os.sep, '/')}' (FORMAT PARQUET, PARTITION_BY (month, operator))
+        """, [before_date] + ([before_date] if relation else []))
+        conn.execute("DROP TABLE lake_pending")
+        conn.execute("DROP TABLE lake_partitions")
+        
+        self._add_files(table, staging_path, partitions)
+        return row_count
+    
+    def months_before(self, conn, table, before_date):
+        """'YYYY-MM' months of the rows of table older than before_date"""
+        
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT strftime(date, '%Y-%m') FROM {table} WHERE date < ?", [before_date]).fetchall()]
+    
+    def compact(self, conn, table, max_files=1):
+        """Merge partitions holding more than max_files small files into one file.
+        
+        The merged file replaces the originals in this build's file set; the
+        originals stay on disk for snapshots that still list them.
+        Returns the number of partitions compacted.
+        """
+        
+        partitions = {}
+        for path in self.files(table):
+            partitions.setdefault(os.path.dirname(path), []).append(path)
+        
+        compacted = 0
+        for partition_dir, paths in partitions.items():
+            if len(paths) <= max_files:
+                continue
+            
+            staging_path = self._staging_path(table)
+            staged_dir = os.path.join(staging_path, os.path.relpath(partition_dir, self.table_path(table)))
+            os.makedirs(staged_dir)
+            file_list = ', '.join(f"'{path.replace(os.sep, '/')}'" for path in paths)
+            conn.execute(f"""
+                COPY (SELECT * FROM read_parquet([{file_list}], hive_partitioning=false) ORDER BY date)
+                TO '{os.path.join(staged_dir, 'compacted.parquet').replace(os.sep, '/')}' (FORMAT PARQUET)
+            """)
+            self._add_files(table, staging_path)
+            compacted += 1
+        
+        return compacted
+    
+    def discard(self, keep_listed=False):
+        """Remove the files this build wrote, for a build that is not going to be published.
+        
+        With keep_listed, only remove those it superseded itself (a partition
+        archived and then compacted in the same build), which no snapshot lists.
+        """
+        
+        listed = {path for paths in self._files.values() for path in paths} if keep_listed else set()
+        for path in self.written:
+            if path not in listed and os.path.exists(path):
+                os.remove(path)
+        self.written = []
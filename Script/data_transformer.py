@@ -1,9 +1,12 @@
 import pandas as pd
-import duckdb
+import numpy as np
+import sys
 from datetime import datetime
+from health_scoring import HealthScorer
 
 class EgyptianTelecomTransformer:
-    def __init__(self):
+    def __init__(self, scoring_spec=None):
+        self.scorer = HealthScorer(scoring_spec)
         self.operator_colors = {
             'vodafone': '#E60000',
             'orange': '#FF6600', 
@@ -17,6 +20,13 @@ class EgyptianTelecomTransformer:
         # Convert date to datetime if it's not
         complaints_df['date'] = pd.to_datetime(complaints_df['date'])
         
+        daily_metrics, category_counts = self._daily_aggregates(complaints_df)
+        
+        return self._finalize_health_metrics(daily_metrics, category_counts)
+    
+    def _daily_aggregates(self, complaints_df):
+        """Aggregate complaints per operator and day"""
+        
         # Daily aggregation by operator
         daily_metrics = complaints_df.groupby(['operator', 'date']).agg({
             'sentiment_score': 'mean',
@@ -32,17 +42,19 @@ class EgyptianTelecomTransformer:
             'replies': 'avg_replies'
         }, inplace=True)
         
-        # Calculate network health score (0-100 scale)
-        max_complaints = daily_metrics['daily_complaints'].max()
+        # Complaint counts per category, used to find the dominant category
+        category_counts = complaints_df.groupby(['operator', 'date', 'complaint_category']).size().reset_index(name='count')
         
-        daily_metrics['network_health_score'] = (
-            (100 - (daily_metrics['daily_complaints'] / max_complaints * 50)) +  # Complaint volume (50%)
-            ((daily_metrics['avg_sentiment'] + 1) * 25) +  # Sentiment (25%)
-            (daily_metrics['avg_likes'] * 5)  # Engagement (25%)
-        ).clip(0, 100)
+        return daily_metrics, category_counts
+    
+    def _finalize_health_metrics(self, daily_metrics, category_counts):
+        """Add health score, dominant category and 7-day trend to daily aggregates"""
+        
+        # Calculate network health score (0-100 scale) from the scoring spec
+        daily_metrics['network_health_score'] = self.scorer.score(daily_metrics)
         
         # Find dominant complaint category per day
-        dominant_categories = complaints_df.groupby(['operator', 'date', 'complaint_category']).size().reset_index(name='count')
+        dominant_categories = category_counts
         idx = dominant_categories.groupby(['operator', 'date'])['count'].idxmax()
         dominant_categories = dominant_categories.loc[idx][['operator', 'date', 'complaint_category']]
         dominant_categories.rename(columns={'complaint_category': 'dominant_complaint_category'}, inplace=True)
@@ -60,6 +72,13 @@ class EgyptianTelecomTransformer:
     def create_operator_benchmarks(self, complaints_df, health_df):
         """Create operator performance benchmarks"""
         
+        benchmarks, category_counts = self._operator_aggregates(complaints_df)
+        
+        return self._finalize_benchmarks(benchmarks, category_counts, health_df)
+    
+    def _operator_aggregates(self, complaints_df):
+        """Aggregate complaints per operator"""
+        
         benchmarks = complaints_df.groupby('operator').agg({
             'sentiment_score': 'mean',
             'complaint_id': 'count',
@@ -74,37 +93,147 @@ class EgyptianTelecomTransformer:
             'replies': 'avg_replies'
         }, inplace=True)
         
+        # Complaint counts per category, used to find the most common category
+        category_counts = complaints_df.groupby(['operator', 'complaint_category']).size().reset_index(name='count')
+        
+        return benchmarks, category_counts
+    
+    def _finalize_benchmarks(self, benchmarks, category_counts, health_df):
+        """Add health scores, most common category and rating to operator aggregates"""
+        
         # Add health scores
         health_avg = health_df.groupby('operator')['network_health_score'].mean().reset_index()
         benchmarks = pd.merge(benchmarks, health_avg, on='operator')
         
         # Find most common complaint category per operator
-        common_categories = complaints_df.groupby(['operator', 'complaint_category']).size().reset_index(name='count')
+        common_categories = category_counts
         idx = common_categories.groupby('operator')['count'].idxmax()
         common_categories = common_categories.loc[idx][['operator', 'complaint_category']]
         common_categories.rename(columns={'complaint_category': 'most_common_category'}, inplace=True)
         
         benchmarks = pd.merge(benchmarks, common_categories, on='operator')
         
-        # Calculate performance rating
-        def get_performance_rating(score):
-            if score >= 80: return 'Excellent'
-            elif score >= 60: return 'Good'
-            elif score >= 40: return 'Fair'
-            else: return 'Poor'
-        
-        benchmarks['performance_rating'] = benchmarks['network_health_score'].apply(get_performance_rating)
+        # Calculate performance rating from the spec's rating bands
+        benchmarks['performance_rating'] = np.asarray(self.scorer.rate(benchmarks['network_health_score']), dtype=object)
         
         return benchmarks.round(3)
+    
+    def calculate_metrics_out_of_core(self, source, chunk_days=30, table='customer_complaints_history'):
+        """Calculate health metrics and benchmarks without loading all complaints.
+        
+        Complaints are read from a Parquet file/glob or a DuckDB database (its
+        history view, so archived complaints are included) in date-partitioned
+        chunks. Each chunk is reduced in a single scan to partial aggregates
+        (counts, sums and per-category counts) which are combined before the
+        health score, dominant category and 7-day trend are applied, so the
+        result matches calculate_network_health_metrics and
+        create_operator_benchmarks on the full data.
+        """
+        
+        # duckdb is only needed here, so the in-memory path doesn't pay for importing it
+        import duckdb
+        
+        conn = duckdb.connect()
+        relation = self._complaints_relation(conn, source, table)
+        
+        min_date, max_date = conn.execute(f"SELECT MIN(date), MAX(date) FROM {relation}").fetchone()
+        if min_date is None:
+            raise ValueError(f"No complaints found in {source}")
+        
+        cell_parts = []
+        chunk_start = pd.Timestamp(min_date)
+        while chunk_start <= pd.Timestamp(max_date):
+            chunk_end = chunk_start + pd.Timedelta(days=chunk_days)
+            
+            # One scan per chunk: partial sums and counts per operator and day, plus the
+            # per-category counts as a second grouping set of the same aggregation
+            cell_parts.append(conn.execute(f"""
+                SELECT 
+                    operator,
+                    date,
+                    complaint_category,
+                    GROUPING(complaint_category) AS all_categories,
+                    COUNT(*) AS count,
+                    COUNT(complaint_id) AS daily_complaints,
+                    FSUM(CAST(sentiment_score AS DOUBLE)) AS sentiment_sum,
+                    COUNT(sentiment_score) AS sentiment_count,
+                    FSUM(CAST(likes AS DOUBLE)) AS likes_sum,
+                    COUNT(likes) AS likes_count,
+                    FSUM(CAST(replies AS DOUBLE)) AS replies_sum,
+                    COUNT(replies) AS replies_count
+                FROM (
+                    SELECT * REPLACE (CAST(date AS DATE) AS date) FROM {relation}
+                    WHERE date >= ? AND date < ?
+                )
+                GROUP BY GROUPING SETS ((operator, date, complaint_category), (operator, date))
+            """, [chunk_start.date(), chunk_end.date()]).fetchdf())
+            
+            chunk_start = chunk_end
+        
+        conn.close()
+        
+        # Split the grouping sets back into daily partials and category counts
+        # (a day split across chunks is summed back together)
+        cells = pd.concat(cell_parts)
+        cells['date'] = pd.to_datetime(cells['date'])
+        daily_cells = cells['all_categories'] == 1
+        daily_sums = cells[daily_cells].drop(columns=['complaint_category', 'all_categories', 'count']).groupby(
+            ['operator', 'date']).sum().reset_index()
+        category_counts = cells[~daily_cells].groupby(
+            ['operator', 'date', 'complaint_category'])['count'].sum().reset_index()
+        
+        daily_metrics = self._averages_from_sums(daily_sums, ['operator', 'date'], 'daily_complaints')
+        health_df = self._finalize_health_metrics(daily_metrics, category_counts)
+        
+        # Operator totals are sums of the daily partials
+        operator_sums = daily_sums.drop(columns='date').groupby('operator').sum().reset_index()
+        benchmarks = self._averages_from_sums(operator_sums, ['operator'], 'total_complaints')
+        operator_categories = category_counts.groupby(['operator', 'complaint_category'])['count'].sum().reset_index()
+        benchmarks_df = self._finalize_benchmarks(benchmarks, operator_categories, health_df)
+        
+        return health_df, benchmarks_df
+    
+    def _complaints_relation(self, conn, source, table):
+        """Return a SQL relation reading complaints from a DuckDB file or Parquet"""
+        
+        source = str(source)
+        if source.endswith('.duckdb'):
+            from connection_pool import current_snapshot_path
+            source = current_snapshot_path(source)
+            conn.execute(f"ATTACH '{source}' AS complaints_source (READ_ONLY)")
+            return f"complaints_source.{table}"
+        
+        return f"read_parquet('{source}', hive_partitioning=true)"
+    
+    def _averages_from_sums(self, sums_df, keys, count_column):
+        """Turn combined partial sums into the averaged columns of the serial path"""
+        
+        result = sums_df[keys].copy()
+        result['avg_sentiment'] = sums_df['sentiment_sum'] / sums_df['sentiment_count']
+        result[count_column] = sums_df['daily_complaints']
+        result['avg_likes'] = sums_df['likes_sum'] / sums_df['likes_count']
+        result['avg_replies'] = sums_df['replies_sum'] / sums_df['replies_count']
+        
+        return result
 
 # Transform the data
 if __name__ == "__main__":
+    transformer = EgyptianTelecomTransformer()
+    
+    # Out-of-core mode: python data_transformer.py <complaints.parquet|egypt_telecom.duckdb>
+    if len(sys.argv) > 1:
+        health_df, benchmarks_df = transformer.calculate_metrics_out_of_core(sys.argv[1])
+        health_df.to_csv('network_health_metrics.csv', index=False)
+        benchmarks_df.to_csv('operator_benchmarks.csv', index=False)
+        print("✅ Saved network health metrics and operator benchmarks (out-of-core)")
+        print("\nOperator Benchmarks:")
+        print(benchmarks_df)
+        sys.exit(0)
+    
     # Load the complaints data
     complaints_df = pd.read_csv('egypt_telecom_complaints.csv')
     complaints_df['date'] = pd.to_datetime(complaints_df['date'])
     
-    transformer = EgyptianTelecomTransformer()
-    
     # Calculate health metrics
     health_df = transformer.calculate_network_health_metrics(complaints_df)
     health_df.to_csv('network_health_metrics.csv', index=False)
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from data_collector import EgyptianTelecomDataCollector
+
+# Operators and governorates the collector produces ('Unknown' when no location is mentioned)
+_collector = EgyptianTelecomDataCollector()
+KNOWN_OPERATORS = tuple(_collector.operators)
+KNOWN_GOVERNORATES = tuple(_collector.egyptian_governorates) + ('Unknown',)
+
+# Column types of the warehouse tables (see TelecomDatabase.create_tables);
+# DECIMAL columns are ('decimal', precision, scale) so values that would overflow are caught
+TABLE_SCHEMAS = {
+    'customer_complaints': {
+        'complaint_id': 'integer', 'operator': 'string', 'complaint_text': 'string',
+        'complaint_category': 'string', 'sentiment_score': ('decimal', 4, 3), 'date': 'date',
+        'governorate': 'string', 'likes': 'integer', 'replies': 'integer', 'source': 'string',
+        'collection_timestamp': 'timestamp',
+    },
+    'network_health_daily': {
+        'operator': 'string', 'date': 'date', 'daily_complaints': 'integer', 'avg_sentiment': ('decimal', 4, 3),
+        'avg_likes': ('decimal', 8, 3), 'avg_replies': ('decimal', 8, 3), 'network_health_score': ('decimal', 5, 2),
+        'dominant_complaint_category': 'string', 'complaint_trend_7d': ('decimal', 10, 3),
+    },
+    'operator_benchmarks': {
+        'operator': 'string', 'total_complaints': 'integer', 'avg_sentiment': ('decimal', 4, 3),
+        'avg_likes': ('decimal', 8, 3), 'avg_replies': ('decimal', 8, 3), 'network_health_score': ('decimal', 5, 2),
+        'most_common_category': 'string', 'performance_rating': 'string',
+    },
+}
+PRIMARY_KEYS = {
+    'customer_complaints': ['complaint_id'],
+    'network_health_daily': ['operator', 'date'],
+    'operator_benchmarks': ['operator'],
+}
+VALUE_RANGES = {
+    'sentiment_score': (-1.0, 1.0),
+    'avg_sentiment': (-1.0, 1.0),
+    'network_health_score': (0.0, 100.0),
+}
+
+# One bit per check, so a row's failures stay a single integer until they are reported
+CHECKS = ('invalid_type', 'missing_key', 'out_of_range', 'unknown_operator',
+          'unknown_governorate', 'duplicate_key', 'future_date')
+CHECK_BITS = {check: np.uint8(1 << bit) for bit, check in enumerate(CHECKS)}
+
+INTEGER_LIMIT = 2 ** 31  # DuckDB INTEGER
+
+
+def _coerce(values, kind):
+    """Convert a column to its schema type; returns the typed column and a mask of unconvertible values"""
+    
+    if isinstance(kind, tuple):
+        return _coerce(values, 'float')
+    if kind == 'string':
+        return values, np.zeros(len(values), dtype=bool)
+    
+    if kind in ('date', 'timestamp'):
+        typed = values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values, errors='coerce')
+        if kind == 'date':
+            typed = typed.dt.normalize()
+    else:
+        typed = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+        typed = typed.astype(np.float64) if kind == 'float' else typed
+    
+    invalid = (typed.isna() & values.notna()).to_numpy()
+    if kind == 'integer':
+        if pd.api.types.is_integer_dtype(typed):
+            invalid = invalid | (typed.abs() >= INTEGER_LIMIT).to_numpy()
+        else:
+            numbers = typed.to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(invalid='ignore'):
+                invalid = invalid | (np.abs(numbers) >= INTEGER_LIMIT) | ((numbers % 1 != 0) & ~np.isnan(numbers))
+    return typed, invalid
+
+
+def _decimal_overflow(values, precision, scale):
+    """Mask of values that don't fit DECIMAL(precision, scale) once rounded to scale digits"""
+    
+    numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return np.round(np.abs(numbers), scale) >= 10.0 ** (precision - scale)
+
+
+def check_batch(batch_df, table, today=None):
+    """Run the data-quality checks for table over a whole batch at once.
+    
+    Every check is a vectorized mask over the batch, OR-ed into one bit per
+    check (see CHECKS). Values too large for a DECIMAL column count as
+    out_of_range. Raises ValueError if the batch is missing columns of
+    the table.
+    
+    Returns the batch converted to the table's column types and the failed
+    check bits per row (0 for rows that passed).
+    """
+    
+    schema = TABLE_SCHEMAS[table]
+    missing = [column for column in schema if column not in batch_df.columns]
+    if missing:
+        raise ValueError(f"Batch for {table} is missing columns: {', '.join(missing)}")
+    
+    failures = np.zeros(len(batch_df), dtype=np.uint8)
+    typed = {}
+    for column, kind in schema.items():
+        typed[column], invalid = _coerce(batch_df[column], kind)
+        failures[invalid] |= CHECK_BITS['invalid_type']
+    typed = pd.DataFrame(typed, index=batch_df.index)
+    
+    keys = PRIMARY_KEYS[table]
+    failures[typed[keys].isna().any(axis=1).to_numpy()] |= CHECK_BITS['missing_key']
+    failures[typed.duplicated(subset=keys, keep='first').to_numpy()] |= CHECK_BITS['duplicate_key']
+    
+    for column, (low, high) in VALUE_RANGES.items():
+        if column in typed:
+            values = typed[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            failures[(values < low) | (values > high)] |= CHECK_BITS['out_of_range']
+    for column, kind in schema.items():
+        if isinstance(kind, tuple):
+            _, precision, scale = kind
+            failures[_decimal_overflow(typed[column], precision, scale)] |= CHECK_BITS['out_of_range']
+    
+    if 'operator' in typed:
+        failures[~typed['operator'].isin(KNOWN_OPERATORS).to_numpy()] |= CHECK_BITS['unknown_operator']
+    if 'governorate' in typed:
+        failures[~typed['governorate'].isin(KNOWN_GOVERNORATES).to_numpy()] |= CHECK_BITS['unknown_governorate']
+    if 'date' in typed:
+        tomorrow = pd.Timestamp(today or date.today()) + pd.Timedelta(days=1)
+        failures[(typed['date'] >= tomorrow).to_numpy()] |= CHECK_BITS['future_date']
+    
+    return typed, failures
+
+
+def validate_batch(batch_df, table, today=None):
+    """Split a batch into typed valid rows and quarantine rows.
+    
+    Returns (valid_df, quarantine_df); quarantine_df holds the original values
+    of the rejected rows and the names of the checks they failed.
+    """
+    
+    typed, failures = check_batch(batch_df, table, today)
+    bad = failures != 0
+    if not bad.any():
+        return typed, quarantine_frame(batch_df.iloc[:0], table, failures[:0])
+    return typed[~bad], quarantine_frame(batch_df[bad], table, failures[bad])
+
+
+def quarantine_frame(rejected_df, table, failures):
+    """Rows for the quarantine table: the original row as JSON plus the failed check names"""
+    
+    reasons = pd.Series(failures).map(
+        lambda bits: ','.join(check for check in CHECKS if bits & CHECK_BITS[check])
+    )
+    row_data = rejected_df.to_json(orient='records', lines=True, date_format='iso',
+                                   force_ascii=False).splitlines() if len(rejected_df) else []
+    return pd.DataFrame({
+        'table_name': table,
+        'row_data': pd.Series(row_data, dtype=object),
+        'rejection_reasons': reasons.astype(object),
+        'quarantined_at': datetime.now(),
+    })
+
+
+def rejection_summary(quarantine_df):
+    """Count of quarantined rows per failed check"""
+    
+    reasons = quarantine_df['rejection_reasons']
+    counts = {check: int(reasons.str.contains(check, regex=False).sum()) for check in CHECKS}
+    return {check: count for check, count in counts.items() if count}
@@ -1,15 +1,30 @@
 import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import os
+from datetime import date, timedelta
+from itertools import groupby
+from connection_pool import (new_snapshot_path, publish_snapshot, discard_snapshot, current_snapshot_path,
+                             snapshot_files, write_snapshot_files)
+from data_lake import TelecomDataLake, ARCHIVED_TABLES
+from sketches import build_cell_sketches, merge_cell_sketches, CELL_COLUMNS
+from data_validation import check_batch, quarantine_frame, rejection_summary, PRIMARY_KEYS, CHECK_BITS, TABLE_SCHEMAS
 
 class TelecomDatabase:
-    def __init__(self, db_path='egypt_telecom.duckdb'):
+    def __init__(self, db_path='egypt_telecom.duckdb', lake_path='data_lake'):
         self.db_path = db_path
-        # Remove existing database to avoid conflicts
-        if os.path.exists(db_path):
-            os.remove(db_path)
-        self.conn = duckdb.connect(db_path)
+        # Start from the lake files of the published snapshot; files other builds left behind are not read
+        previous_snapshot = current_snapshot_path(db_path)
+        self.lake = TelecomDataLake(lake_path, snapshot_files(previous_snapshot))
+        if snapshot_files(previous_snapshot) is None and os.path.exists(previous_snapshot):
+            # Snapshot published before file lists: record what it reads so pruning it cleans up
+            write_snapshot_files(previous_snapshot, self.lake.manifest())
+        # Build into a new snapshot so dashboards reading the published database are not disturbed
+        self.snapshot_path = new_snapshot_path(db_path)
+        self.conn = duckdb.connect(self.snapshot_path)
         self.create_tables()
+        self.create_history_views()
     
     def create_tables(self):
         """Create database tables"""
@@ -38,11 +53,11 @@ class TelecomDatabase:
                 date DATE,
                 daily_complaints INTEGER,
                 avg_sentiment DECIMAL(4,3),
-                avg_likes DECIMAL(6,3),
-                avg_replies DECIMAL(6,3),
+                avg_likes DECIMAL(8,3),
+                avg_replies DECIMAL(8,3),
                 network_health_score DECIMAL(5,2),
                 dominant_complaint_category VARCHAR,
-                complaint_trend_7d DECIMAL(6,3),
+                complaint_trend_7d DECIMAL(10,3),
                 PRIMARY KEY (operator, date)
             )
         """)
@@ -53,97 +68,356 @@ class TelecomDatabase:
                 operator VARCHAR PRIMARY KEY,
                 total_complaints INTEGER,
                 avg_sentiment DECIMAL(4,3),  -- Changed from DECIMAL(5,2) to DECIMAL(4,3)
-                avg_likes DECIMAL(6,3),
-                avg_replies DECIMAL(6,3),
+                avg_likes DECIMAL(8,3),
+                avg_replies DECIMAL(8,3),
                 network_health_score DECIMAL(5,2),
                 most_common_category VARCHAR,
                 performance_rating VARCHAR
             )
         """)
         
+        # Rows rejected by the ingest validation, kept as JSON with the failed checks
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS quarantined_rows (
+                table_name VARCHAR,
+                row_data VARCHAR,
+                rejection_reasons VARCHAR,
+                quarantined_at TIMESTAMP
+            )
+        """)
+        
         print("✅ Database tables created successfully!")
     
     def load_data(self):
-        """Load CSV data into database"""
+        """Validate CSV data and load it into the database in one transaction"""
         
-        try:
-            # Load complaints data
-            if not os.path.exists('egypt_telecom_complaints.csv'):
-                raise FileNotFoundError("Complaints CSV file not found")
+        sources = [
+            ('customer_complaints', 'egypt_telecom_complaints.csv', 'complaints'),
+            ('network_health_daily', 'network_health_metrics.csv', 'health records'),
+            ('operator_benchmarks', 'operator_benchmarks.csv', 'operator benchmarks'),
+        ]
+        
+        # Either every table is loaded or none is, so a failure can't leave half-loaded tables behind
+        self.conn.execute("BEGIN TRANSACTION")
+        for table, csv_path, label in sources:
+            try:
+                if not os.path.exists(csv_path):
+                    raise FileNotFoundError(f"{csv_path} not found")
                 
-            complaints_df = pd.read_csv('egypt_telecom_complaints.csv')
-            print(f"Loaded complaints data: {len(complaints_df)} rows")
-            
-            # Ensure date is properly formatted
-            complaints_df['date'] = pd.to_datetime(complaints_df['date']).dt.date
+                batch_df = pd.read_csv(csv_path)
+                print(f"Loaded {label} data: {len(batch_df)} rows")
+                
+                loaded, quarantined = self.ingest_batch(batch_df, table)
+                print(f"✅ Loaded {loaded} {label} into database")
+                if len(quarantined):
+                    print(f"⚠️ Quarantined {len(quarantined)} {label}: {rejection_summary(quarantined)}")
             
-            # Register and insert complaints data
-            self.conn.register('complaints_df', complaints_df)
-            self.conn.execute("""
-                INSERT INTO customer_complaints 
-                SELECT * FROM complaints_df
+            except Exception as e:
+                print(f"❌ Error loading {label}: {e}")
+                self.conn.execute("ROLLBACK")
+                return False
+        
+        self.conn.execute("COMMIT")
+        print("🎉 All data loaded successfully!")
+        return True
+    
+    def ingest_batch(self, batch_df, table):
+        """Validate a batch and insert it into table, quarantining rejected rows.
+        
+        Rows whose key is already in the table are rejected as duplicates too.
+        The batch is handed to DuckDB as an Arrow table and the valid rows are
+        selected during the insert, so they are never copied out in pandas.
+        Returns the number of rows inserted and the quarantined rows.
+        """
+        
+        typed_df, failures = check_batch(batch_df, table)
+        batch = pa.Table.from_pandas(typed_df, preserve_index=False)
+        # DATE columns as date32, since DuckDB 0.9 cannot cast nanosecond timestamps to DATE
+        for column, kind in TABLE_SCHEMAS[table].items():
+            if kind == 'date':
+                index = batch.schema.get_field_index(column)
+                batch = batch.set_column(index, column, batch[column].cast(pa.date32()))
+        
+        # Keys already in the table are duplicates as well (e.g. a batch ingested twice)
+        keys = PRIMARY_KEYS[table]
+        self.conn.register('batch_keys', batch.select(keys).append_column('_row', pa.array(np.arange(len(batch)))))
+        existing = self.conn.execute(f"""
+            SELECT _row FROM batch_keys SEMI JOIN {table} USING ({', '.join(keys)})
+        """).fetchnumpy()['_row']
+        self.conn.unregister('batch_keys')
+        failures[existing] |= CHECK_BITS['duplicate_key']
+        
+        self.conn.register('batch', batch.append_column('_failures', pa.array(failures)))
+        self.conn.execute(f"""
+            INSERT INTO {table} BY NAME
+            SELECT * EXCLUDE (_failures) FROM batch WHERE _failures = 0
+        """)
+        self.conn.unregister('batch')
+        
+        bad = failures != 0
+        quarantine_df = quarantine_frame(batch_df[bad], table, failures[bad])
+        if len(quarantine_df):
+            self.conn.register('quarantine_df', quarantine_df)
+            self.conn.execute("INSERT INTO quarantined_rows BY NAME SELECT * FROM quarantine_df")
+            self.conn.unregister('quarantine_df')
+        
+        return int(len(failures) - bad.sum()), quarantine_df
+    
+    def archive_history(self, hot_days=90):
+        """Move rows older than hot_days into the Parquet data lake, including late arrivals"""
+        
+        cutoff = date.today() - timedelta(days=hot_days)
+        for table in ARCHIVED_TABLES:
+            archived = self.lake.archive(self.conn, table, cutoff, PRIMARY_KEYS[table])
+            compacted = self.lake.compact(self.conn, table)
+            # Only rows whose key is in the lake leave the hot table; only their months are read
+            relation = self.lake.relation(table, self.lake.months_before(self.conn, table, cutoff))
+            if relation is not None:
+                key_match = ' AND '.join(f"archived.{key} = {table}.{key}" for key in PRIMARY_KEYS[table])
+                self.conn.execute(f"""
+                    DELETE FROM {table}
+                    WHERE date < ? AND EXISTS (SELECT 1 FROM {relation} archived WHERE {key_match})
+                """, [cutoff])
+            print(f"✅ Archived {archived} {table} rows before {cutoff} ({compacted} partitions compacted)")
+    
+    def create_history_views(self):
+        """Create views combining hot tables with the archived lake history"""
+        
+        # The month column lets date filters prune lake partitions
+        for table in ARCHIVED_TABLES:
+            relation = self.lake.relation(table)
+            archived = f"UNION ALL BY NAME SELECT * FROM {relation}" if relation else ""
+            self.conn.execute(f"""
+                CREATE OR REPLACE VIEW {table}_history AS
+                SELECT *, strftime(date, '%Y-%m') AS month FROM {table}
+                {archived}
             """)
-            print(f"✅ Loaded {len(complaints_df)} complaints into database")
-            
-        except Exception as e:
-            print(f"❌ Error loading complaints data: {e}")
-            return
+    
+    def build_sketch_rollups(self, chunk_days=30):
+        """Build per operator/day and operator/month sketches for the approximate dashboard mode"""
         
-        try:
-            # Load health metrics
-            if not os.path.exists('network_health_metrics.csv'):
-                raise FileNotFoundError("Health metrics CSV file not found")
-                
-            health_df = pd.read_csv('network_health_metrics.csv')
-            print(f"Loaded health data: {len(health_df)} rows")
-            
-            # Ensure date is properly formatted
-            health_df['date'] = pd.to_datetime(health_df['date']).dt.date
-            
-            # Register and insert health data
-            self.conn.register('health_df', health_df)
-            self.conn.execute("""
-                INSERT INTO network_health_daily 
-                SELECT * FROM health_df
+        self.create_history_views()
+        
+        for table, period in (('complaint_sketches', 'date'), ('complaint_sketch_months', 'month')):
+            self.conn.execute(f"""
+                CREATE OR REPLACE TABLE {table} (
+                    operator VARCHAR,
+                    {period} DATE,
+                    complaints INTEGER,
+                    sentiment_sum DOUBLE,
+                    distinct_ids BLOB,
+                    sentiment_histogram BLOB,
+                    category_sketch BLOB,
+                    text_sketch BLOB,
+                    PRIMARY KEY (operator, {period})
+                )
             """)
-            print(f"✅ Loaded {len(health_df)} health records into database")
-            
-        except Exception as e:
-            print(f"❌ Error loading health metrics: {e}")
+        
+        min_date, max_date = self.conn.execute(
+            "SELECT MIN(date), MAX(date) FROM customer_complaints_history").fetchone()
+        if min_date is None:
             return
         
-        try:
-            # Load benchmarks
-            if not os.path.exists('operator_benchmarks.csv'):
-                raise FileNotFoundError("Benchmarks CSV file not found")
-                
-            benchmarks_df = pd.read_csv('operator_benchmarks.csv')
-            print(f"Loaded benchmarks data: {len(benchmarks_df)} rows")
+        # Sketch one date range at a time so the full history never has to fit in memory
+        chunk_start = min_date
+        while chunk_start <= max_date:
+            chunk_end = chunk_start + timedelta(days=chunk_days)
+            chunk_df = self.conn.execute("""
+                SELECT operator, date, complaint_id, complaint_category, complaint_text,
+                       CAST(sentiment_score AS DOUBLE) AS sentiment_score
+                FROM customer_complaints_history
+                WHERE date >= ? AND date < ?
+            """, [chunk_start, chunk_end]).fetchdf()
             
-            # FIX: Ensure avg_sentiment is properly scaled (already between -1 and 1)
-            # Remove the division by 100 that was causing the error
-            if 'avg_sentiment' in benchmarks_df.columns:
-                # Convert to float and ensure it's within proper range
-                benchmarks_df['avg_sentiment'] = pd.to_numeric(benchmarks_df['avg_sentiment'], errors='coerce')
-                # No division needed - sentiment is already between -1 and 1
+            # Plain dates, since DuckDB 0.9 cannot cast nanosecond timestamps to DATE
+            cells = [dict(operator=operator, date=day.date(), **build_cell_sketches(cell_df))
+                     for (operator, day), cell_df in chunk_df.groupby(['operator', 'date'])]
+            if cells:
+                self._insert_sketches('complaint_sketches', cells)
             
-            # Register and insert benchmarks data
-            self.conn.register('benchmarks_df', benchmarks_df)
-            self.conn.execute("""
-                INSERT INTO operator_benchmarks 
-                SELECT * FROM benchmarks_df
-            """)
-            print("✅ Loaded operator benchmarks into database")
-            
-        except Exception as e:
-            print(f"❌ Error loading benchmarks: {e}")
+            chunk_start = chunk_end
+        
+        # Pre-merge each operator-month, so wide date ranges merge a few cells instead of every day
+        months = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT CAST(DATE_TRUNC('month', date) AS DATE) FROM complaint_sketches ORDER BY 1").fetchall()]
+        for month in months:
+            month_cells = self.conn.execute(f"""
+                SELECT operator, {CELL_COLUMNS} FROM complaint_sketches
+                WHERE date >= ? AND date < ?
+                ORDER BY operator
+            """, [month, (month + timedelta(days=32)).replace(day=1)]).fetchall()
+            cells = [dict(operator=operator, month=month, **merge_cell_sketches([cell[1:] for cell in operator_cells]))
+                     for operator, operator_cells in groupby(month_cells, key=lambda cell: cell[0])]
+            self._insert_sketches('complaint_sketch_months', cells)
+        
+        cell_count = self.conn.execute("SELECT COUNT(*) FROM complaint_sketches").fetchone()[0]
+        print(f"✅ Built sketches for {cell_count} operator-days in {len(months)} months")
+    
+    def _insert_sketches(self, table, cells):
+        self.conn.register('sketches_df', pd.DataFrame(cells))
+        self.conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM sketches_df")
+        self.conn.unregister('sketches_df')
+    
+    def refresh_geo_cube(self, full=False):
+        """Refresh the governorate × operator × category × week cube.
+        
+        Cells are computed per week with CUBE over the other three dimensions,
+        so any slice is a filter on grouping_id plus a sum over weeks. Weeks
+        whose complaints are unchanged since the published snapshot are copied
+        from it; only new or changed weeks are aggregated from raw complaints.
+        With full, every week is aggregated again.
+        """
+        
+        self.create_history_views()
+        
+        # Per-week fingerprints to detect which weeks changed: hot weeks by row count and a
+        # checksum of the columns the cube reads (so corrected rows count as changes), archived
+        # weeks by the lake files they span (archive and compact only write files under new names)
+        lake_weeks = self._lake_files_by_week('customer_complaints')
+        self.conn.register('lake_weeks', pd.DataFrame({
+            # Plain dates, since DuckDB 0.9 cannot cast nanosecond timestamps to DATE
+            'week': pd.Series(list(lake_weeks), dtype=object),
+            'lake_files': pd.Series(list(lake_weeks.values()), dtype=object),
+        }))
+        self.conn.execute("""
+            CREATE OR REPLACE TABLE geo_cube_weeks AS
+            SELECT 
+                week,
+                COALESCE(hot.complaints, 0) AS hot_complaints,
+                hot.checksum AS hot_checksum,
+                lake.lake_files
+            FROM (
+                SELECT 
+                    CAST(DATE_TRUNC('week', date) AS DATE) AS week,
+                    COUNT(*) AS complaints,
+                    SUM(hash(complaint_id, date, governorate, operator, complaint_category, sentiment_score)) AS checksum
+                FROM customer_complaints
+                GROUP BY 1
+            ) hot
+            FULL OUTER JOIN (SELECT CAST(week AS DATE) AS week, lake_files FROM lake_weeks) lake USING (week)
+        """)
+        self.conn.unregister('lake_weeks')
+        
+        self.conn.execute("""
+            CREATE OR REPLACE TABLE geo_cube (
+                week DATE,
+                governorate VARCHAR,
+                operator VARCHAR,
+                complaint_category VARCHAR,
+                grouping_id INTEGER,
+                complaints INTEGER,
+                sentiment_sum DOUBLE,
+                sentiment_p10 DOUBLE,
+                sentiment_p25 DOUBLE,
+                sentiment_p50 DOUBLE,
+                sentiment_p75 DOUBLE,
+                sentiment_p90 DOUBLE
+            )
+        """)
+        
+        # Reuse unchanged weeks from the currently published snapshot
+        previous_snapshot = current_snapshot_path(self.db_path)
+        self.conn.execute("CREATE OR REPLACE TEMP TABLE reused_weeks (week DATE)")
+        if not full and os.path.exists(previous_snapshot) and previous_snapshot != self.snapshot_path:
+            try:
+                self.conn.execute(f"ATTACH '{previous_snapshot}' AS previous_snapshot (READ_ONLY)")
+                self.conn.execute("""
+                    INSERT INTO reused_weeks
+                    SELECT week
+                    FROM previous_snapshot.geo_cube_weeks previous
+                    JOIN geo_cube_weeks current USING (week)
+                    WHERE previous.hot_complaints = current.hot_complaints
+                      AND previous.hot_checksum IS NOT DISTINCT FROM current.hot_checksum
+                      AND previous.lake_files IS NOT DISTINCT FROM current.lake_files
+                """)
+                self.conn.execute("""
+                    INSERT INTO geo_cube
+                    SELECT cube.* FROM previous_snapshot.geo_cube cube JOIN reused_weeks USING (week)
+                """)
+            except duckdb.Error as e:
+                # First run with the cube, or an older snapshot without it
+                print(f"Rebuilding full geo cube: {str(e).splitlines()[0]}")
+                self.conn.execute("DELETE FROM reused_weeks")
+            finally:
+                self.conn.execute("DETACH DATABASE IF EXISTS previous_snapshot")
+        
+        reused_weeks = self.conn.execute("SELECT COUNT(*) FROM reused_weeks").fetchone()[0]
+        
+        # Only the months holding a changed week are scanned, so unchanged lake partitions are skipped
+        changed_weeks = [row[0] for row in self.conn.execute(
+            "SELECT week FROM geo_cube_weeks WHERE week NOT IN (SELECT week FROM reused_weeks)").fetchall()]
+        months = sorted({day.strftime('%Y-%m') for week in changed_weeks for day in (week, week + timedelta(days=6))})
+        if not months:
+            print(f"✅ Geo cube refreshed: 0 weeks recomputed, {reused_weeks} reused")
             return
         
-        print("🎉 All data loaded successfully!")
+        self.conn.execute(f"""
+            INSERT INTO geo_cube
+            SELECT 
+                CAST(DATE_TRUNC('week', date) AS DATE) AS week,
+                governorate,
+                operator,
+                complaint_category,
+                GROUPING(governorate, operator, complaint_category) AS grouping_id,
+                COUNT(*) AS complaints,
+                SUM(sentiment_score) AS sentiment_sum,
+                quantile_cont(CAST(sentiment_score AS DOUBLE), 0.10) AS sentiment_p10,
+                quantile_cont(CAST(sentiment_score AS DOUBLE), 0.25) AS sentiment_p25,
+                quantile_cont(CAST(sentiment_score AS DOUBLE), 0.50) AS sentiment_p50,
+                quantile_cont(CAST(sentiment_score AS DOUBLE), 0.75) AS sentiment_p75,
+                quantile_cont(CAST(sentiment_score AS DOUBLE), 0.90) AS sentiment_p90
+            FROM customer_complaints_history
+            WHERE month IN ({', '.join(f"'{month}'" for month in months)})
+              AND CAST(DATE_TRUNC('week', date) AS DATE) NOT IN (SELECT week FROM reused_weeks)
+            GROUP BY CAST(DATE_TRUNC('week', date) AS DATE), CUBE(governorate, operator, complaint_category)
+        """)
+        
+        print(f"✅ Geo cube refreshed: {len(changed_weeks)} weeks recomputed, {reused_weeks} reused")
+    
+    def _lake_files_by_week(self, table):
+        """Map each week overlapping an archived month of table to the sorted lake files of that month"""
+        
+        month_files = {}
+        for path in self.lake.files(table):
+            partition = os.path.relpath(path, self.lake.table_path(table)).replace(os.sep, '/')
+            month_files.setdefault(partition.split('/')[0][len('month='):], []).append(partition)
+        
+        week_files = {}
+        for month, files in sorted(month_files.items()):
+            month_start = date.fromisoformat(f"{month}-01")
+            next_month = (month_start + timedelta(days=31)).replace(day=1)
+            week = month_start - timedelta(days=month_start.weekday())
+            while week < next_month:
+                week_files.setdefault(week, []).extend(sorted(files))
+                week += timedelta(days=7)
+        return {week: '|'.join(files) for week, files in week_files.items()}
+    
+    def publish(self):
+        """Atomically swap the loaded snapshot in as the current database"""
+        
+        self.create_history_views()
+        write_snapshot_files(self.snapshot_path, self.lake.manifest())
+        self.lake.discard(keep_listed=True)
+        
+        # Readers in other processes cannot open a file held read-write, so close it first
+        self.conn.execute("CHECKPOINT")
+        self.conn.close()
+        publish_snapshot(self.db_path, self.snapshot_path)
+        self.conn = duckdb.connect(self.snapshot_path, read_only=True)
+        print(f"✅ Published database snapshot {os.path.basename(self.snapshot_path)}")
+    
+    def discard(self):
+        """Close and remove a snapshot build that is not going to be published"""
+        
+        self.conn.close()
+        discard_snapshot(self.snapshot_path)
+        self.lake.discard()
     
     def run_analytics(self):
         """Run analytical queries"""
         
+        analytics = TelecomAnalytics(self.conn)
+        
         print("\n" + "="*50)
         print("📊 EGYPTIAN TELECOM ANALYTICS DASHBOARD")
         print("="*50)
@@ -151,89 +425,171 @@ class TelecomDatabase:
         try:
             # 1. Operator Performance Ranking
             print("\n1. 🏆 OPERATOR PERFORMANCE RANKING:")
-            result = self.conn.execute("""
-                SELECT 
-                    operator,
-                    ROUND(network_health_score, 2) as health_score,
-                    performance_rating,
-                    total_complaints,
-                    most_common_category,
-                    ROUND(avg_sentiment, 3) as sentiment
-                FROM operator_benchmarks
-                ORDER BY health_score DESC
-            """).fetchdf()
+            result = analytics.fetch('operator_ranking')
             print(result.to_string(index=False))
-            
+        
         except Exception as e:
             print(f"Error in operator performance query: {e}")
         
         try:
             # 2. Complaint Category Analysis
             print("\n2. 📋 COMPLAINT CATEGORY BREAKDOWN:")
-            result = self.conn.execute("""
-                SELECT 
-                    complaint_category,
-                    COUNT(*) as complaint_count,
-                    ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM customer_complaints), 2) as percentage,
-                    ROUND(AVG(sentiment_score), 3) as avg_sentiment
-                FROM customer_complaints
-                GROUP BY complaint_category
-                ORDER BY complaint_count DESC
-            """).fetchdf()
+            result = analytics.fetch('category_breakdown')
             print(result.to_string(index=False))
-            
+        
         except Exception as e:
             print(f"Error in complaint category query: {e}")
         
         try:
             # 3. Geographic Analysis
             print("\n3. 🗺️ COMPLAINTS BY GOVERNORATE:")
-            result = self.conn.execute("""
-                SELECT 
-                    governorate,
-                    COUNT(*) as complaint_count,
-                    ROUND(AVG(sentiment_score), 3) as avg_sentiment,
-                    CASE 
-                        WHEN AVG(sentiment_score) > 0 THEN 'Positive'
-                        WHEN AVG(sentiment_score) > -0.3 THEN 'Neutral' 
-                        ELSE 'Negative'
-                    END as sentiment_category
-                FROM customer_complaints
-                WHERE governorate != 'Unknown'
-                GROUP BY governorate
-                ORDER BY complaint_count DESC
-                LIMIT 10
-            """).fetchdf()
+            result = analytics.fetch('governorate_analysis')
             print(result.to_string(index=False))
-            
+        
         except Exception as e:
             print(f"Error in geographic analysis query: {e}")
         
         try:
             # 4. Weekly Trends
             print("\n4. 📈 WEEKLY PERFORMANCE TRENDS:")
-            result = self.conn.execute("""
-                SELECT 
-                    operator,
-                    DATE_TRUNC('week', date) as week_start,
-                    ROUND(AVG(network_health_score), 2) as weekly_health_score,
-                    SUM(daily_complaints) as weekly_complaints
-                FROM network_health_daily
-                GROUP BY operator, DATE_TRUNC('week', date)
-                ORDER BY week_start DESC, weekly_health_score DESC
-                LIMIT 12
-            """).fetchdf()
+            result = analytics.fetch('weekly_trends')
             print(result.to_string(index=False))
-            
+        
         except Exception as e:
             print(f"Error in weekly trends query: {e}")
 
+class TelecomAnalytics:
+    """Parameterized analytical queries shared by run_analytics and the query API"""
+    
+    QUERIES = ('operator_ranking', 'category_breakdown', 'governorate_analysis', 'weekly_trends')
+    # Filters each analysis can apply; anything else is rejected rather than ignored
+    QUERY_FILTERS = {
+        'operator_ranking': ('operator',),
+        'category_breakdown': ('operator', 'governorate', 'start_date', 'end_date'),
+        'governorate_analysis': ('operator', 'governorate', 'start_date', 'end_date', 'limit'),
+        'weekly_trends': ('operator', 'start_date', 'end_date', 'limit'),
+    }
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def fetch(self, name, **filters):
+        """Run a named analysis and return it as a DataFrame"""
+        
+        sql, params = self.query(name, **filters)
+        return self.conn.execute(sql, params).fetchdf()
+    
+    def query(self, name, **filters):
+        """Return (sql, params) for a named analysis.
+        
+        Raises ValueError for an unknown analysis or a filter it does not support.
+        """
+        
+        if name not in self.QUERIES:
+            raise ValueError(f"Unknown analysis: {name}")
+        unsupported = set(filters) - set(self.QUERY_FILTERS[name])
+        if unsupported:
+            raise ValueError(f"{name} does not support filters: {', '.join(sorted(unsupported))}")
+        return getattr(self, f"_{name}_query")(**filters)
+    
+    def _where(self, conditions=None, operator=None, governorate=None, start_date=None, end_date=None):
+        """Build a WHERE clause and its parameters from the common filters"""
+        
+        conditions = list(conditions or [])
+        params = []
+        for condition, value in (("operator = ?", operator), ("governorate = ?", governorate),
+                                 ("date >= ?", start_date), ("date <= ?", end_date)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        
+        # Month bounds let DuckDB skip archived lake partitions outside the date range
+        for condition, value in (("month >= ?", start_date), ("month <= ?", end_date)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value.strftime('%Y-%m'))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+    
+    def _operator_ranking_query(self, operator=None):
+        where, params = self._where(operator=operator)
+        return f"""
+            SELECT 
+                operator,
+                ROUND(network_health_score, 2) as health_score,
+                performance_rating,
+                total_complaints,
+                most_common_category,
+                ROUND(avg_sentiment, 3) as sentiment
+            FROM operator_benchmarks
+            {where}
+            ORDER BY health_score DESC
+        """, params
+    
+    def _category_breakdown_query(self, operator=None, governorate=None, start_date=None, end_date=None):
+        where, params = self._where(operator=operator, governorate=governorate,
+                                    start_date=start_date, end_date=end_date)
+        return f"""
+            SELECT 
+                complaint_category,
+                COUNT(*) as complaint_count,
+                ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 2) as percentage,
+                ROUND(AVG(sentiment_score), 3) as avg_sentiment
+            FROM customer_complaints_history
+            {where}
+            GROUP BY complaint_category
+            ORDER BY complaint_count DESC
+        """, params
+    
+    def _governorate_analysis_query(self, operator=None, governorate=None, start_date=None, end_date=None,
+                                    limit=10):
+        where, params = self._where(["governorate != 'Unknown'"], operator=operator, governorate=governorate,
+                                    start_date=start_date, end_date=end_date)
+        return f"""
+            SELECT 
+                governorate,
+                COUNT(*) as complaint_count,
+                ROUND(AVG(sentiment_score), 3) as avg_sentiment,
+                CASE 
+                    WHEN AVG(sentiment_score) > 0 THEN 'Positive'
+                    WHEN AVG(sentiment_score) > -0.3 THEN 'Neutral' 
+                    ELSE 'Negative'
+                END as sentiment_category
+            FROM customer_complaints_history
+            {where}
+            GROUP BY governorate
+            ORDER BY complaint_count DESC
+            LIMIT ?
+        """, params + [int(limit)]
+    
+    def _weekly_trends_query(self, operator=None, start_date=None, end_date=None, limit=12):
+        where, params = self._where(operator=operator, start_date=start_date, end_date=end_date)
+        return f"""
+            SELECT 
+                operator,
+                DATE_TRUNC('week', date) as week_start,
+                ROUND(AVG(network_health_score), 2) as weekly_health_score,
+                CAST(SUM(daily_complaints) AS BIGINT) as weekly_complaints
+            FROM network_health_daily_history
+            {where}
+            GROUP BY operator, DATE_TRUNC('week', date)
+            ORDER BY week_start DESC, weekly_health_score DESC
+            LIMIT ?
+        """, params + [int(limit)]
+
 # Initialize database
 if __name__ == "__main__":
     try:
         db = TelecomDatabase()
-        db.load_data()
-        db.run_analytics()
+        if db.load_data():
+            db.archive_history()
+            db.build_sketch_rollups()
+            db.refresh_geo_cube()
+            db.publish()
+            db.run_analytics()
+        else:
+            db.discard()
     except Exception as e:
         print(f"❌ Error in main execution: {e}")
         print("\n💡 TROUBLESHOOTING:")
@@ -0,0 +1,109 @@
+import copy
+import json
+import numpy as np
+import pandas as pd
+
+# Declarative network health score:
+#   score = base + sum(weight * normalize(column + offset)), clipped, then mapped to rating bands.
+# The default reproduces the original formula:
+#   (100 - complaints / max_complaints * 50) + (sentiment + 1) * 25 + likes * 5
+DEFAULT_SCORING_SPEC = {
+    'base': 100.0,
+    'components': [
+        {'column': 'daily_complaints', 'weight': -50.0, 'normalizer': 'max'},
+        {'column': 'avg_sentiment', 'weight': 25.0, 'offset': 1.0},
+        {'column': 'avg_likes', 'weight': 5.0},
+    ],
+    'clip': [0.0, 100.0],
+    # Bands are (minimum score, rating) from best to worst; below all bands gets default_rating
+    'rating_bands': [[80.0, 'Excellent'], [60.0, 'Good'], [40.0, 'Fair']],
+    'default_rating': 'Poor',
+}
+
+NORMALIZERS = ('none', 'max', 'minmax', 'zscore')
+
+
+class HealthScorer:
+    """Evaluate a scoring spec as one vectorized expression over daily aggregates"""
+    
+    def __init__(self, spec=None):
+        self.spec = copy.deepcopy(spec or DEFAULT_SCORING_SPEC)
+        for component in self.spec['components']:
+            if component.get('normalizer', 'none') not in NORMALIZERS:
+                raise ValueError(f"Unknown normalizer {component['normalizer']}, expected one of {NORMALIZERS}")
+    
+    @classmethod
+    def from_json(cls, path):
+        with open(path, encoding='utf-8') as spec_file:
+            return cls(json.load(spec_file))
+    
+    def with_weights(self, rating_bands=None, **weights):
+        """Copy of this scorer with some component weights or the rating bands replaced (for what-if runs)"""
+        
+        spec = copy.deepcopy(self.spec)
+        for component in spec['components']:
+            if component['column'] in weights:
+                component['weight'] = float(weights[component['column']])
+        if rating_bands is not None:
+            spec['rating_bands'] = [[float(minimum), rating] for minimum, rating in rating_bands]
+        return HealthScorer(spec)
+    
+    def score(self, daily_df):
+        """Score every row of a DataFrame of daily aggregates"""
+        
+        score = np.full(len(daily_df), self.spec['base'], dtype=np.float64)
+        for component in self.spec['components']:
+            values = daily_df[component['column']].to_numpy(dtype=np.float64)
+            if component.get('offset'):
+                values = values + component['offset']
+            
+            normalizer = component.get('normalizer', 'none')
+            if normalizer == 'max':
+                values = values / np.nanmax(values)
+            elif normalizer == 'minmax':
+                low, high = np.nanmin(values), np.nanmax(values)
+                values = (values - low) / (high - low) if high > low else np.zeros_like(values)
+            elif normalizer == 'zscore':
+                std = np.nanstd(values)
+                values = (values - np.nanmean(values)) / std if std > 0 else np.zeros_like(values)
+            
+            score += values * component['weight']
+        
+        low, high = self.spec.get('clip') or (-np.inf, np.inf)
+        return np.clip(score, low, high)
+    
+    def rate(self, scores):
+        """Map scores to rating labels"""
+        
+        scores = np.asarray(scores, dtype=np.float64)
+        bands = self.spec['rating_bands']
+        
+        # Integer codes into the band labels, best band last so it wins; NaN falls to the default
+        codes = np.full(len(scores), len(bands), dtype=np.int8)
+        for code in range(len(bands) - 1, -1, -1):
+            codes[scores >= bands[code][0]] = code
+        labels = [rating for _, rating in bands] + [self.spec['default_rating']]
+        return pd.Categorical.from_codes(codes, categories=labels)
+    
+    def what_if(self, daily_df):
+        """Rescore precomputed operator-days without touching raw complaints"""
+        
+        scores = self.score(daily_df)
+        return daily_df[['operator', 'date']].assign(network_health_score=scores,
+                                                     performance_rating=self.rate(scores))
+
+
+def load_daily_aggregates(conn, source='network_health_daily_history'):
+    """Fetch the daily aggregates a scoring spec runs on"""
+    
+    return conn.execute(f"""
+        SELECT 
+            operator,
+            date,
+            daily_complaints,
+            CAST(avg_sentiment AS DOUBLE) AS avg_sentiment,
+            CAST(avg_likes AS DOUBLE) AS avg_likes,
+            CAST(avg_replies AS DOUBLE) AS avg_replies
+        FROM {source}
+        ORDER BY operator, date
+    """).fetchdf().astype({'operator': 'category'})
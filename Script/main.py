@@ -1,57 +1,161 @@
 #!/usr/bin/env python3
 """
 Egyptian Telecom Analytics - Main Execution Script
-Run this file to execute the complete project
+Run this file to execute the complete project, or a single stage:
+    
+    python main.py [run]                      # complete pipeline (default)
+    python main.py collect [num_complaints]   # generate synthetic complaints
+    python main.py transform [source] [--scoring-spec spec.json]
+                                              # health metrics and benchmarks
+    python main.py load                       # build and publish the warehouse
+    python main.py analytics                  # print analytics from the published warehouse
+    python main.py dashboard [port]           # Streamlit dashboard with prewarmed caches
+    python main.py api [port]                 # analytics query API
+    python main.py replay [recording] [speed] # replay recorded complaints for load testing
+
+Each command imports only the modules it needs, so heavy libraries (pandas,
+duckdb, plotly, streamlit) are loaded on demand rather than at startup.
 """
 
 import os
 import sys
-from datetime import datetime
+import argparse
 
-def main():
-    print("🚀 Starting Egyptian Telecom Analytics Project...")
-    print("=" * 60)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def collect(num_complaints=600):
+    print("\n📊 PHASE 1: Data Collection")
+    print("-" * 30)
     
-    # Check if required files exist, if not generate data
-    if not os.path.exists('egypt_telecom_complaints.csv'):
-        print("\n📊 PHASE 1: Data Collection")
-        print("-" * 30)
-        
-        from data_collector import EgyptianTelecomDataCollector
-        collector = EgyptianTelecomDataCollector()
-        
-        print("Generating synthetic Egyptian telecom complaints...")
-        df_complaints = collector.generate_realistic_complaints(600)
-        collector.save_complaints_data(df_complaints)
-        print(f"✅ Generated {len(df_complaints)} realistic complaints")
+    from data_collector import EgyptianTelecomDataCollector
+    collector = EgyptianTelecomDataCollector()
     
-    # Phase 2: Data Transformation
+    print("Generating synthetic Egyptian telecom complaints...")
+    df_complaints = collector.generate_realistic_complaints(num_complaints)
+    collector.save_complaints_data(df_complaints)
+    print(f"✅ Generated {len(df_complaints)} realistic complaints")
+
+
+def transform(source=None, scoring_spec=None):
     print("\n🔄 PHASE 2: Data Transformation")
     print("-" * 30)
     
     from data_transformer import EgyptianTelecomTransformer
-    transformer = EgyptianTelecomTransformer()
+    from health_scoring import HealthScorer
+    # A JSON scoring spec replaces the default health score formula and rating bands
+    scorer = HealthScorer.from_json(scoring_spec) if scoring_spec else HealthScorer()
+    transformer = EgyptianTelecomTransformer(scorer.spec)
     
-    # Load and transform data
-    complaints_df = pd.read_csv('egypt_telecom_complaints.csv')
-    complaints_df['date'] = pd.to_datetime(complaints_df['date'])
+    if source:
+        # Out-of-core mode over Parquet or the published warehouse
+        health_df, benchmarks_df = transformer.calculate_metrics_out_of_core(source)
+    else:
+        import pandas as pd
+        
+        # Load and transform data
+        complaints_df = pd.read_csv('egypt_telecom_complaints.csv')
+        complaints_df['date'] = pd.to_datetime(complaints_df['date'])
+        
+        health_df = transformer.calculate_network_health_metrics(complaints_df)
+        benchmarks_df = transformer.create_operator_benchmarks(complaints_df, health_df)
     
-    health_df = transformer.calculate_network_health_metrics(complaints_df)
     health_df.to_csv('network_health_metrics.csv', index=False)
     print("✅ Network health metrics calculated")
-    
-    benchmarks_df = transformer.create_operator_benchmarks(complaints_df, health_df)
     benchmarks_df.to_csv('operator_benchmarks.csv', index=False)
     print("✅ Operator benchmarks calculated")
-    
-    # Phase 3: Database Setup
+
+
+def load():
     print("\n🗄️ PHASE 3: Data Warehouse")
     print("-" * 30)
     
     from database_manager import TelecomDatabase
     db = TelecomDatabase()
-    db.load_data()
+    try:
+        loaded = db.load_data()
+        if loaded:
+            db.archive_history()
+            db.build_sketch_rollups()
+            db.refresh_geo_cube()
+    except Exception:
+        # Never leave a half-built snapshot behind
+        db.discard()
+        raise
+    
+    if not loaded:
+        db.discard()
+        return None
+    
+    db.publish()
     print("✅ Data loaded into database")
+    return db
+
+
+def analytics():
+    from connection_pool import ReadOnlyConnectionPool
+    from database_manager import TelecomAnalytics
+    
+    queries = TelecomAnalytics(ReadOnlyConnectionPool('egypt_telecom.duckdb').cursor())
+    for name in TelecomAnalytics.QUERIES:
+        print(f"\n📈 {name.replace('_', ' ').upper()}:")
+        print(queries.fetch(name).to_string(index=False))
+
+
+def _prewarm_dashboard():
+    # Import in parallel with server start-up, then fill the caches once the runtime exists
+    import time
+    import dashboard_data
+    from streamlit.runtime import Runtime
+    
+    while not Runtime.exists():
+        time.sleep(0.1)
+    dashboard_data.prewarm()
+
+
+def dashboard(port=8501, prewarm=True):
+    import threading
+    from streamlit.web import cli as stcli
+    
+    if prewarm:
+        threading.Thread(target=_prewarm_dashboard, daemon=True).start()
+    
+    # Serve in this process so the prewarmed caches are the ones sessions read
+    sys.argv = ['streamlit', 'run', os.path.join(SCRIPT_DIR, 'telecom_dashboard.py'), '--server.port', str(port)]
+    stcli.main()
+
+
+def api(port=8600):
+    import asyncio
+    from analytics_api import AnalyticsAPIServer
+    
+    try:
+        asyncio.run(AnalyticsAPIServer(port=port).serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 Analytics API stopped")
+
+
+def replay(recording='complaints_recording.arrow', speed=3600.0, sink='database', max_seconds=None):
+    from stream_replay import record_from_collector, run_replay
+    
+    if not os.path.exists(recording):
+        # Offline recording from the synthetic collector
+        print(f"✅ Recorded {record_from_collector(100_000, recording):,} complaints to {recording}")
+    run_replay(recording, speed, sink, max_seconds)
+
+
+def run():
+    print("🚀 Starting Egyptian Telecom Analytics Project...")
+    print("=" * 60)
+    
+    # Check if required files exist, if not generate data
+    if not os.path.exists('egypt_telecom_complaints.csv'):
+        collect()
+    
+    transform()
+    db = load()
+    if db is None:
+        return
     
     # Run analytics
     print("\n📈 PHASE 4: Analytics")
@@ -62,7 +166,7 @@ def main():
     print("\n" + "=" * 60)
     print("🎉 PROJECT SETUP COMPLETED SUCCESSFULLY!")
     print("\n🚀 NEXT STEPS:")
-    print("1. Run the dashboard: streamlit run telecom_dashboard.py")
+    print("1. Run the dashboard: python main.py dashboard")
     print("2. Open http://localhost:8501 in your browser")
     print("3. Explore the Egyptian telecom analytics!")
     print("\n💡 TIPS:")
@@ -70,6 +174,52 @@ def main():
     print("- Hover over charts for detailed information")
     print("- Check the geographic analysis for regional insights")
 
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Egyptian Telecom Analytics")
+    commands = parser.add_subparsers(dest='command')
+    
+    commands.add_parser('run', help="complete pipeline: collect, transform, load, analytics")
+    command = commands.add_parser('collect', help="generate synthetic complaints")
+    command.add_argument('num_complaints', nargs='?', type=int, default=600)
+    command = commands.add_parser('transform', help="calculate health metrics and benchmarks")
+    command.add_argument('source', nargs='?', help="Parquet file/glob or .duckdb for the out-of-core mode")
+    command.add_argument('--scoring-spec', help="JSON health scoring spec (see health_scoring.DEFAULT_SCORING_SPEC)")
+    commands.add_parser('load', help="build and publish the warehouse snapshot")
+    commands.add_parser('analytics', help="print analytics from the published warehouse")
+    command = commands.add_parser('dashboard', help="serve the Streamlit dashboard")
+    command.add_argument('port', nargs='?', type=int, default=8501)
+    command.add_argument('--no-prewarm', dest='prewarm', action='store_false',
+                         help="skip filling the dashboard caches at server start")
+    command = commands.add_parser('api', help="serve the analytics query API")
+    command.add_argument('port', nargs='?', type=int, default=8600)
+    command = commands.add_parser('replay', help="replay a complaint recording into the ingest path")
+    command.add_argument('recording', nargs='?', default='complaints_recording.arrow',
+                         help="Arrow IPC or Parquet recording (generated offline if missing)")
+    command.add_argument('speed', nargs='?', type=float, default=3600.0,
+                         help="multiple of real time, 0 for as fast as possible")
+    command.add_argument('--sink', choices=['database', 'validate', 'null'], default='database')
+    command.add_argument('--max-seconds', type=float)
+    
+    return parser
+
+
+COMMANDS = {
+    'run': run,
+    'collect': collect,
+    'transform': transform,
+    'load': load,
+    'analytics': analytics,
+    'dashboard': dashboard,
+    'api': api,
+    'replay': replay,
+}
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    COMMANDS[args.pop('command') or 'run'](**args)
+
+
 if __name__ == "__main__":
-    import pandas as pd
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,116 @@
+import os
+import math
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor
+
+from data_transformer import EgyptianTelecomTransformer
+
+# Columns the transformer needs; everything else stays in the parent process
+PARTITION_COLUMNS = ['complaint_id', 'operator', 'complaint_category', 'sentiment_score', 'date', 'likes', 'replies']
+
+
+def _read_batch(ipc_path, batch_index):
+    """Read one record batch from the memory-mapped Arrow IPC file"""
+    
+    with pa.memory_map(ipc_path) as source:
+        return pa.ipc.open_file(source).get_batch(batch_index).to_pandas()
+
+
+def _partition_aggregates(ipc_path, batch_index):
+    """Daily aggregates and operator partial sums for one operator/date-range partition"""
+    
+    complaints_df = _read_batch(ipc_path, batch_index)
+    daily_metrics, category_counts = EgyptianTelecomTransformer()._daily_aggregates(complaints_df)
+    
+    # Same partial-sum columns as the out-of-core path, combined into operator totals by the parent
+    operator_sums = complaints_df.groupby('operator').agg(
+        daily_complaints=('complaint_id', 'count'),
+        sentiment_sum=('sentiment_score', 'sum'),
+        sentiment_count=('sentiment_score', 'count'),
+        likes_sum=('likes', 'sum'),
+        likes_count=('likes', 'count'),
+        replies_sum=('replies', 'sum'),
+        replies_count=('replies', 'count')
+    ).reset_index()
+    
+    return daily_metrics, category_counts, operator_sums
+
+
+class ParallelTelecomTransformer(EgyptianTelecomTransformer):
+    def __init__(self, max_workers=None, partition_days=7, scoring_spec=None):
+        super().__init__(scoring_spec)
+        self.max_workers = max_workers or os.cpu_count()
+        self.partition_days = partition_days
+        self.phase_seconds = {}
+    
+    def calculate_metrics_parallel(self, complaints_df):
+        """Calculate health metrics and benchmarks across a process pool.
+        
+        Complaints are split by operator and date range and written once to an
+        Arrow IPC file (in shared memory where available). Workers memory-map
+        that file and read only their own record batch, so the input is never
+        pickled. Each worker returns the daily aggregates of its partition plus
+        operator partial sums; the parent merges them in sorted key order and
+        combines the partial sums into operator totals (as the out-of-core path
+        does), then finishes with the same code as the serial path.
+        
+        Wall time of the serial parent phases and of the pool is recorded in
+        phase_seconds, to tell how much of a run can scale with workers.
+        """
+        
+        phase_start = time.perf_counter()
+        frame = complaints_df[PARTITION_COLUMNS].assign(date=pd.to_datetime(complaints_df['date']))
+        
+        # One stable sort by partition key keeps the original row order inside each
+        # partition, so every partition is a contiguous, zero-copy slice of one table
+        operator_codes, _ = pd.factorize(frame['operator'], sort=True)
+        date_bucket = ((frame['date'] - frame['date'].min()).dt.days // self.partition_days).to_numpy()
+        order = np.lexsort((date_bucket, operator_codes))
+        partition_key = operator_codes[order].astype(np.int64) * (date_bucket.max() + 1) + date_bucket[order]
+        boundaries = np.flatnonzero(np.diff(partition_key)) + 1
+        starts = np.concatenate([[0], boundaries])
+        lengths = np.diff(np.concatenate([starts, [len(frame)]]))
+        
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        with tempfile.TemporaryDirectory(dir=shm_dir) as tmp_dir:
+            ipc_path = os.path.join(tmp_dir, 'complaints.arrow')
+            
+            table = pa.Table.from_pandas(frame.iloc[order], preserve_index=False).combine_chunks()
+            with pa.OSFile(ipc_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    for start, length in zip(starts, lengths):
+                        writer.write_table(table.slice(start, length), max_chunksize=length)
+            del table
+            self.phase_seconds['prepare'] = time.perf_counter() - phase_start
+            
+            phase_start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(_partition_aggregates, [ipc_path] * len(starts), range(len(starts))))
+            self.phase_seconds['workers'] = time.perf_counter() - phase_start
+        
+        phase_start = time.perf_counter()
+        
+        # Deterministic merge: partitions never share a key, so sorting restores the serial order
+        daily_metrics = pd.concat([daily for daily, _, _ in results]).sort_values(
+            ['operator', 'date']).reset_index(drop=True)
+        category_counts = pd.concat([counts for _, counts, _ in results]).sort_values(
+            ['operator', 'date', 'complaint_category']).reset_index(drop=True)
+        health_df = self._finalize_health_metrics(daily_metrics, category_counts)
+        
+        # Operator totals from the partial sums; fsum keeps the combination exactly rounded
+        partial_sums = pd.concat([sums for _, _, sums in results])
+        sum_columns = ['sentiment_sum', 'likes_sum', 'replies_sum']
+        operator_sums = partial_sums.groupby('operator', sort=True).agg(
+            {column: math.fsum if column in sum_columns else 'sum' for column in partial_sums.columns
+             if column != 'operator'}
+        ).reset_index()
+        benchmarks = self._averages_from_sums(operator_sums, ['operator'], 'total_complaints')
+        operator_categories = category_counts.groupby(['operator', 'complaint_category'])['count'].sum().reset_index()
+        benchmarks_df = self._finalize_benchmarks(benchmarks, operator_categories, health_df)
+        self.phase_seconds['merge'] = time.perf_counter() - phase_start
+        
+        return health_df, benchmarks_df
@@ -0,0 +1,311 @@
+import json
+import struct
+import zlib
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+# Fixed hash key so sketches built in different runs can be merged
+HASH_KEY = 'egypttelecom2025'
+
+
+def hash_values(values):
+    """64-bit hashes of an array of values"""
+    
+    return pd.util.hash_array(np.asarray(values, dtype=object), hash_key=HASH_KEY, categorize=False)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch (relative standard error 1.04 / sqrt(2 ** precision))"""
+    
+    def __init__(self, precision=14, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(2 ** precision, dtype=np.uint8)
+    
+    def add(self, values):
+        hashes = hash_values(values)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        
+        # Rank = position of the first 1-bit in the remaining bits, counted in 32-bit halves
+        remaining = hashes << np.uint64(self.precision)
+        high = (remaining >> np.uint64(32)).astype(np.float64)
+        low = (remaining & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        with np.errstate(divide='ignore'):
+            leading_zeros = np.where(high > 0, 31 - np.floor(np.log2(high)),
+                                     np.where(low > 0, 63 - np.floor(np.log2(low)), 64))
+        rank = np.minimum(leading_zeros + 1, 64 - self.precision + 1).astype(np.uint8)
+        
+        np.maximum.at(self.registers, index, rank)
+        return self
+    
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+    
+    @classmethod
+    def merged(cls, sketches):
+        registers = np.maximum.reduce([sketch.registers for sketch in sketches])
+        return cls(int(np.log2(len(registers))), registers)
+    
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+    
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        
+        # Linear counting for small cardinalities
+        empty = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and empty > 0:
+            return m * np.log(m / empty)
+        return raw
+    
+    def to_bytes(self):
+        return zlib.compress(self.registers.tobytes())
+    
+    @classmethod
+    def from_bytes(cls, data):
+        registers = np.frombuffer(zlib.decompress(data), dtype=np.uint8).copy()
+        return cls(int(np.log2(len(registers))), registers)
+
+
+class BoundedHistogram:
+    """Mergeable quantile sketch for values in a known range.
+    
+    Sentiment scores are bounded to [-1, 1], so a fixed-bin histogram gives
+    quantiles with a deterministic error of at most half a bin width, and
+    merging is a plain sum of the bin counts.
+    """
+    
+    def __init__(self, low=-1.0, high=1.0, bins=400, counts=None):
+        self.low = low
+        self.high = high
+        self.counts = counts if counts is not None else np.zeros(bins, dtype=np.int64)
+    
+    @property
+    def bin_width(self):
+        return (self.high - self.low) / len(self.counts)
+    
+    @property
+    def value_error(self):
+        return self.bin_width / 2
+    
+    def add(self, values):
+        values = np.clip(np.asarray(values, dtype=np.float64), self.low, self.high)
+        values = values[~np.isnan(values)]
+        index = np.minimum(((values - self.low) / self.bin_width).astype(np.int64), len(self.counts) - 1)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        return self
+    
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+    
+    @classmethod
+    def merged(cls, sketches):
+        sketches = list(sketches)
+        return cls(sketches[0].low, sketches[0].high, counts=np.sum([sketch.counts for sketch in sketches], axis=0))
+    
+    def quantile(self, q):
+        total = self.counts.sum()
+        if total == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * total, side='left'))
+        return self.low + (min(index, len(self.counts) - 1) + 0.5) * self.bin_width
+    
+    def to_bytes(self):
+        return struct.pack('<dd', self.low, self.high) + zlib.compress(self.counts.tobytes())
+    
+    @classmethod
+    def from_bytes(cls, data):
+        low, high = struct.unpack('<dd', data[:16])
+        counts = np.frombuffer(zlib.decompress(data[16:]), dtype=np.int64).copy()
+        return cls(low, high, counts=counts)
+
+
+class TopKSketch:
+    """Count-Min sketch with a heavy-hitter candidate list.
+    
+    Estimates overcount by at most e / width of the total count with
+    probability 1 - exp(-depth). Merging sums the count matrices and
+    re-estimates the union of the candidates.
+    """
+    
+    def __init__(self, width=272, depth=5, k=20, table=None, candidates=None):
+        self.k = k
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+        self.candidates = candidates if candidates is not None else {}
+    
+    @property
+    def total(self):
+        return int(self.table[0].sum())
+    
+    @property
+    def epsilon(self):
+        return np.e / self.table.shape[1]
+    
+    def _columns(self, hashes):
+        depth, width = self.table.shape
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        return [(h1 + row * h2) % width for row in range(depth)]
+    
+    def add(self, values):
+        counts = pd.Series(values).value_counts()
+        columns = self._columns(hash_values(counts.index))
+        for row, column in enumerate(columns):
+            np.add.at(self.table[row], column, counts.to_numpy())
+        
+        self._keep_top(list(counts.index) + list(self.candidates))
+        return self
+    
+    def estimate(self, keys):
+        columns = self._columns(hash_values(keys))
+        return np.min([self.table[row, column] for row, column in enumerate(columns)], axis=0)
+    
+    def _keep_top(self, keys):
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        estimates = self.estimate(keys)
+        top = np.argsort(-estimates, kind='stable')[:self.k]
+        self.candidates = {keys[i]: int(estimates[i]) for i in top}
+    
+    def merge(self, other):
+        self.table += other.table
+        self._keep_top(list(self.candidates) + list(other.candidates))
+        return self
+    
+    @classmethod
+    def merged(cls, sketches):
+        """Merge many sketches at once, re-estimating the candidates only once"""
+        
+        sketches = list(sketches)
+        merged = cls(k=sketches[0].k, table=np.sum([sketch.table for sketch in sketches], axis=0))
+        merged._keep_top([key for sketch in sketches for key in sketch.candidates])
+        return merged
+    
+    def top(self, n=1):
+        return sorted(self.candidates.items(), key=lambda item: -item[1])[:n]
+    
+    def to_bytes(self):
+        header = json.dumps({'k': self.k, 'shape': self.table.shape, 'candidates': self.candidates},
+                            ensure_ascii=False).encode('utf-8')
+        return struct.pack('<I', len(header)) + header + zlib.compress(self.table.tobytes())
+    
+    @classmethod
+    def from_bytes(cls, data):
+        header_length = struct.unpack('<I', data[:4])[0]
+        header = json.loads(data[4:4 + header_length].decode('utf-8'))
+        table = np.frombuffer(zlib.decompress(data[4 + header_length:]), dtype=np.int64)
+        return cls(k=header['k'], table=table.reshape(header['shape']).copy(), candidates=header['candidates'])
+
+
+def build_cell_sketches(complaints_df):
+    """Sketch one rollup cell of complaints into serialized blobs"""
+    
+    return {
+        'complaints': len(complaints_df),
+        'sentiment_sum': float(complaints_df['sentiment_score'].sum()),
+        'distinct_ids': HyperLogLog().add(complaints_df['complaint_id']).to_bytes(),
+        'sentiment_histogram': BoundedHistogram().add(complaints_df['sentiment_score']).to_bytes(),
+        'category_sketch': TopKSketch().add(complaints_df['complaint_category']).to_bytes(),
+        'text_sketch': TopKSketch().add(complaints_df['complaint_text']).to_bytes(),
+    }
+
+
+CELL_COLUMNS = 'complaints, sentiment_sum, distinct_ids, sentiment_histogram, category_sketch, text_sketch'
+
+
+def _merge_cells(cells):
+    """Merge rows of CELL_COLUMNS into the total count, sentiment sum and merged sketches"""
+    
+    return (
+        sum(cell[0] for cell in cells),
+        sum(cell[1] for cell in cells),
+        HyperLogLog.merged(HyperLogLog.from_bytes(cell[2]) for cell in cells),
+        BoundedHistogram.merged(BoundedHistogram.from_bytes(cell[3]) for cell in cells),
+        TopKSketch.merged(TopKSketch.from_bytes(cell[4]) for cell in cells),
+        TopKSketch.merged(TopKSketch.from_bytes(cell[5]) for cell in cells),
+    )
+
+
+def merge_cell_sketches(cells):
+    """Merge rows of CELL_COLUMNS into one coarser rollup cell, serialized like build_cell_sketches"""
+    
+    complaints, sentiment_sum, distinct_ids, histogram, categories, texts = _merge_cells(cells)
+    return {
+        'complaints': complaints,
+        'sentiment_sum': sentiment_sum,
+        'distinct_ids': distinct_ids.to_bytes(),
+        'sentiment_histogram': histogram.to_bytes(),
+        'category_sketch': categories.to_bytes(),
+        'text_sketch': texts.to_bytes(),
+    }
+
+
+def _conditions(filters):
+    """SQL conditions and parameters for the (condition, value) filters whose value is set"""
+    
+    filters = [(condition, value) for condition, value in filters if value is not None]
+    return [condition for condition, _ in filters], [value for _, value in filters]
+
+
+def approximate_kpis(conn, operator=None, start_date=None, end_date=None):
+    """Merge the rollup cells of a filter into dashboard KPIs with their error bounds.
+    
+    Months wholly inside [start_date, end_date] are read from the per
+    operator-month cells and only the partial months at the edges from the
+    per operator-day cells, so a wide range merges a few cells per month.
+    The complaint total and average sentiment come from the exact per-cell
+    counts and sums; the sketches only answer distinct counts, quantiles and
+    top-k.
+    """
+    
+    # Whole months are those from full_start up to (not including) full_end; None is unbounded
+    full_start = None
+    if start_date is not None:
+        full_start = start_date if start_date.day == 1 else (start_date.replace(day=1) + timedelta(days=32)).replace(day=1)
+    full_end = (end_date + timedelta(days=1)).replace(day=1) if end_date is not None else None
+    
+    month_conditions, month_params = _conditions(
+        (("operator = ?", operator), ("month >= ?", full_start), ("month < ?", full_end)))
+    day_conditions, day_params = _conditions(
+        (("operator = ?", operator), ("date >= ?", start_date), ("date <= ?", end_date)))
+    edge_conditions, edge_params = _conditions((("date < ?", full_start), ("date >= ?", full_end)))
+    
+    cells = conn.execute(f"""
+        SELECT {CELL_COLUMNS} FROM complaint_sketch_months
+        {'WHERE ' + ' AND '.join(month_conditions) if month_conditions else ''}
+    """, month_params).fetchall()
+    # Unbounded on both sides, every day falls in a whole month
+    if edge_conditions:
+        day_conditions.append(f"({' OR '.join(edge_conditions)})")
+        cells += conn.execute(f"""
+            SELECT {CELL_COLUMNS} FROM complaint_sketches
+            WHERE {' AND '.join(day_conditions)}
+        """, day_params + edge_params).fetchall()
+    if not cells:
+        return None
+    
+    complaints, sentiment_sum, distinct_ids, histogram, categories, texts = _merge_cells(cells)
+    distinct_estimate = distinct_ids.estimate()
+    top_category = categories.top(1)[0]
+    top_text = texts.top(1)[0]
+    
+    return {
+        'total_complaints': complaints,
+        'distinct_complaints': distinct_estimate,
+        'distinct_complaints_error': distinct_estimate * distinct_ids.relative_error,
+        'avg_sentiment': sentiment_sum / complaints,
+        'median_sentiment': histogram.quantile(0.5),
+        'p90_sentiment': histogram.quantile(0.9),
+        'sentiment_error': histogram.value_error,
+        'most_common_issue': top_category[0],
+        'most_common_issue_count': top_category[1],
+        'most_common_text': top_text[0],
+        'most_common_text_count': top_text[1],
+        'count_error': categories.epsilon * categories.total,
+    }
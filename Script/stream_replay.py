@@ -0,0 +1,243 @@
+"""
+Replay a recorded complaint stream in event-time order for load testing
+Usage:
+    python stream_replay.py record [num_complaints] [recording.arrow]
+    python stream_replay.py record-db [egypt_telecom.duckdb] [recording.arrow]
+    python stream_replay.py replay [recording.arrow] [speed] [database|validate|null] [max_seconds]
+
+A speed of 0 replays as fast as the sink accepts batches.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SECONDS_PER_DAY = 86400
+RECORD_BATCH_ROWS = 65536
+
+
+def write_recording(complaints, path):
+    """Write complaints sorted by event time as Arrow IPC (.arrow) or Parquet (.parquet)"""
+    
+    table = complaints if isinstance(complaints, pa.Table) else pa.Table.from_pandas(complaints, preserve_index=False)
+    table = table.sort_by([('date', 'ascending'), ('complaint_id', 'ascending')])
+    
+    if path.endswith('.parquet'):
+        pq.write_table(table, path, row_group_size=RECORD_BATCH_ROWS)
+    else:
+        # Uncompressed so the file can be memory-mapped without copying
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=RECORD_BATCH_ROWS)
+    return len(table)
+
+
+def record_from_collector(num_complaints, path):
+    """Generate a recording offline with the synthetic collector"""
+    
+    from data_collector import EgyptianTelecomDataCollector
+    return write_recording(EgyptianTelecomDataCollector().generate_realistic_complaints(num_complaints), path)
+
+
+def record_from_database(db_path, path):
+    """Record the published customer_complaints history (hot table and archived lake)"""
+    
+    import duckdb
+    from connection_pool import current_snapshot_path
+    
+    conn = duckdb.connect(current_snapshot_path(db_path), read_only=True)
+    try:
+        table = conn.execute("SELECT * EXCLUDE (month) FROM customer_complaints_history").fetch_arrow_table()
+    finally:
+        conn.close()
+    return write_recording(table, path)
+
+
+def open_recording(path):
+    """Open a recording as an Arrow table.
+    
+    Arrow IPC files are memory-mapped, so batches are zero-copy views of the
+    page cache and a recording larger than RAM can be replayed. Parquet is
+    read through a memory map but has to be decoded on open.
+    """
+    
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def event_seconds(table, time_column='date'):
+    """Event time of every row in seconds since the first event.
+    
+    Recordings only carry the complaint date, so rows of one day are spread
+    evenly across it (in recorded order) instead of all arriving at midnight.
+    """
+    
+    column = table.column(time_column)
+    if pa.types.is_date(column.type):
+        days = column.cast(pa.date32()).to_numpy().astype(np.int64)
+        order = np.argsort(days, kind='stable')
+        sorted_days = days[order]
+        _, first_row, inverse, day_rows = np.unique(sorted_days, return_index=True, return_inverse=True,
+                                                    return_counts=True)
+        rank_in_day = np.arange(len(sorted_days)) - first_row[inverse]
+        seconds = np.empty(len(days), dtype=np.float64)
+        seconds[order] = (sorted_days - sorted_days[0]) * SECONDS_PER_DAY + rank_in_day / day_rows[inverse] * SECONDS_PER_DAY
+        return seconds
+    
+    timestamps = column.cast(pa.timestamp('us')).to_numpy().astype(np.int64)
+    return (timestamps - timestamps.min()) / 1e6
+
+
+class ComplaintReplay:
+    """Emit a recorded complaint stream in event-time order at a multiple of real time.
+    
+    Every tick, the rows whose event time has passed on the replay clock are
+    sent to the sink as one Arrow batch. If the sink falls behind, batches grow
+    (up to max_batch_rows) and lag shows how far ingestion trails the stream.
+    Lag includes up to one tick of batching delay.
+    """
+    
+    def __init__(self, path, speed=60.0, time_column='date', tick=0.1, max_batch_rows=RECORD_BATCH_ROWS):
+        self.table = open_recording(path)
+        self.speed = speed
+        self.tick = tick
+        self.max_batch_rows = max_batch_rows
+        
+        seconds = event_seconds(self.table, time_column)
+        if np.all(seconds[1:] >= seconds[:-1]):
+            self.order = None  # already in event order: batches are zero-copy slices
+            self.seconds = seconds
+        else:
+            self.order = np.argsort(seconds, kind='stable')
+            self.seconds = seconds[self.order]
+    
+    def _batch(self, start, end):
+        if self.order is None:
+            return self.table.slice(start, end - start)
+        return self.table.take(pa.array(self.order[start:end]))
+    
+    def run(self, sink, max_seconds=None):
+        """Replay into sink (a callable taking an Arrow table) and return throughput and lag statistics"""
+        
+        num_rows = len(self.seconds)
+        lags = []
+        batch_rows = []
+        position = 0
+        start = time.perf_counter()
+        
+        while position < num_rows:
+            elapsed = time.perf_counter() - start
+            if max_seconds is not None and elapsed >= max_seconds:
+                break
+            
+            # Rows due on the replay clock; unpaced replay takes whatever the sink can absorb
+            due = num_rows if not self.speed else int(np.searchsorted(self.seconds, elapsed * self.speed, side='right'))
+            if due == position:
+                time.sleep(min(self.tick, self.seconds[position] / self.speed - elapsed))
+                continue
+            
+            end = min(due, position + self.max_batch_rows)
+            emitted = elapsed
+            sink(self._batch(position, end))
+            
+            done = time.perf_counter() - start
+            # Lag of the oldest row in the batch: from when it was due to when the sink finished with it
+            lags.append(done - self.seconds[position] / self.speed if self.speed else 0.0)
+            batch_rows.append(end - position)
+            position = end
+            
+            # One batch per tick; a sink slower than the tick gets the next batch right away
+            if self.speed:
+                time.sleep(max(0.0, emitted + self.tick - (time.perf_counter() - start)))
+        
+        wall_seconds = time.perf_counter() - start
+        replayed_seconds = self.seconds[position - 1] if position else 0.0
+        lags = np.array(lags) if lags else np.zeros(1)
+        return {
+            'rows': position,
+            'batches': len(batch_rows),
+            'avg_batch_rows': float(np.mean(batch_rows)) if batch_rows else 0.0,
+            'wall_seconds': wall_seconds,
+            'rows_per_second': position / wall_seconds if wall_seconds else 0.0,
+            'event_days_replayed': replayed_seconds / SECONDS_PER_DAY,
+            'achieved_speed': replayed_seconds / wall_seconds if wall_seconds else 0.0,
+            'lag_p50': float(np.percentile(lags, 50)),
+            'lag_p95': float(np.percentile(lags, 95)),
+            'lag_max': float(lags.max()),
+        }
+
+
+def database_sink(db, table='customer_complaints'):
+    """Sink feeding batches through the validated ingest of a TelecomDatabase"""
+    
+    def ingest(batch):
+        db.ingest_batch(batch.to_pandas(date_as_object=False), table)
+    return ingest
+
+
+def validation_sink(table='customer_complaints'):
+    """Sink running only the ingest checks, without a database"""
+    
+    from data_validation import check_batch
+    
+    def validate(batch):
+        check_batch(batch.to_pandas(date_as_object=False), table)
+    return validate
+
+
+def null_sink(batch):
+    """Sink discarding batches, to measure the replay itself"""
+
+
+def run_replay(path='complaints_recording.arrow', speed=3600.0, sink_name='database', max_seconds=None):
+    replay = ComplaintReplay(path, speed=speed)
+    print(f"📼 Replaying {len(replay.seconds):,} complaints over {replay.seconds[-1] / SECONDS_PER_DAY:.1f} days "
+          f"of event time at {f'{speed:g}x' if speed else 'full'} speed into the {sink_name} sink")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = None
+        if sink_name == 'database':
+            # Scratch warehouse, so the published snapshot is not touched
+            from database_manager import TelecomDatabase
+            db = TelecomDatabase(os.path.join(tmp_dir, 'egypt_telecom.duckdb'), os.path.join(tmp_dir, 'data_lake'))
+            sink = database_sink(db)
+        elif sink_name == 'validate':
+            sink = validation_sink()
+        else:
+            sink = null_sink
+        
+        stats = replay.run(sink, max_seconds)
+        
+        if db is not None:
+            loaded = db.conn.execute("SELECT COUNT(*) FROM customer_complaints").fetchone()[0]
+            quarantined = db.conn.execute("SELECT COUNT(*) FROM quarantined_rows").fetchone()[0]
+            print(f"🗄️ {loaded:,} complaints ingested, {quarantined:,} quarantined")
+            db.conn.close()
+    
+    print(f"Rows: {stats['rows']:,} in {stats['batches']:,} batches (avg {stats['avg_batch_rows']:.0f} rows)")
+    print(f"Throughput: {stats['rows_per_second']:,.0f} rows/s over {stats['wall_seconds']:.1f}s")
+    print(f"Event time: {stats['event_days_replayed']:.2f} days replayed, achieved {stats['achieved_speed']:,.0f}x real time")
+    print(f"Lag: p50 {stats['lag_p50'] * 1000:.1f} ms  p95 {stats['lag_p95'] * 1000:.1f} ms  max {stats['lag_max'] * 1000:.1f} ms")
+    return stats
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'replay'
+    if command == 'record':
+        num_complaints = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        path = sys.argv[3] if len(sys.argv) > 3 else 'complaints_recording.arrow'
+        print(f"✅ Recorded {record_from_collector(num_complaints, path):,} complaints to {path}")
+    elif command == 'record-db':
+        db_path = sys.argv[2] if len(sys.argv) > 2 else 'egypt_telecom.duckdb'
+        path = sys.argv[3] if len(sys.argv) > 3 else 'complaints_recording.arrow'
+        print(f"✅ Recorded {record_from_database(db_path, path):,} complaints to {path}")
+    else:
+        path = sys.argv[2] if len(sys.argv) > 2 else 'complaints_recording.arrow'
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else 3600.0
+        sink_name = sys.argv[4] if len(sys.argv) > 4 else 'database'
+        max_seconds = float(sys.argv[5]) if len(sys.argv) > 5 else None
+        run_replay(path, speed, sink_name, max_seconds)
@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import duckdb
 from datetime import datetime, timedelta
+from health_scoring import HealthScorer
+from dashboard_data import get_connection_pool, get_approximate_kpis, get_geo_slices, get_daily_aggregates
 
 # Page configuration
 st.set_page_config(
@@ -50,10 +51,9 @@ st.markdown("""
 st.markdown('<h1 class="main-header">🇪🇬 Egyptian Telecom Customer Experience Analytics</h1>', unsafe_allow_html=True)
 
 # Connect to database
-@st.cache_resource
 def get_db_connection():
     try:
-        conn = duckdb.connect('egypt_telecom.duckdb')
+        conn = get_connection_pool().cursor()
         # Test connection
         conn.execute("SELECT 1").fetchall()
         return conn
@@ -68,18 +68,18 @@ if conn is None:
     st.stop()
 
 # Safe database query function
-def safe_db_query(query, default_value=None):
+def safe_db_query(query, default_value=None, params=None):
     try:
-        result = conn.execute(query).fetchall()
+        result = conn.execute(query, params).fetchall()
         return result
     except Exception as e:
         st.warning(f"Query failed: {e}")
         return default_value
 
 # Safe dataframe query function
-def safe_df_query(query, default_df=None):
+def safe_df_query(query, default_df=None, params=None):
     try:
-        result = conn.execute(query).fetchdf()
+        result = conn.execute(query, params).fetchdf()
         return result
     except Exception as e:
         st.warning(f"DataFrame query failed: {e}")
@@ -89,7 +89,7 @@ def safe_df_query(query, default_df=None):
 st.sidebar.title("🔧 Filters & Controls")
 
 # Get available operators safely
-operators_result = safe_db_query("SELECT DISTINCT operator FROM customer_complaints")
+operators_result = safe_db_query("SELECT DISTINCT operator FROM customer_complaints_history")
 available_operators = ["All"] + [op[0] for op in operators_result] if operators_result else ["All"]
 
 selected_operator = st.sidebar.selectbox(
@@ -99,8 +99,8 @@ selected_operator = st.sidebar.selectbox(
 
 # Date range filter with safe defaults
 try:
-    min_date_result = safe_db_query("SELECT MIN(date) FROM customer_complaints")
-    max_date_result = safe_db_query("SELECT MAX(date) FROM customer_complaints")
+    min_date_result = safe_db_query("SELECT MIN(date) FROM customer_complaints_history")
+    max_date_result = safe_db_query("SELECT MAX(date) FROM customer_complaints_history")
     
     if min_date_result and max_date_result:
         min_date = min_date_result[0][0]
@@ -119,6 +119,21 @@ date_range = st.sidebar.date_input(
     max_value=max_date
 )
 
+approx_mode = st.sidebar.toggle(
+    "⚡ Approximate mode",
+    help="Answer KPIs from precomputed sketches instead of full scans"
+)
+
+# The KPIs follow the operator and date filters; while a range is being picked only its start is set
+kpi_operator = None if selected_operator == "All" else selected_operator
+kpi_dates = tuple(date_range) if isinstance(date_range, (tuple, list)) else (date_range,)
+kpi_start = kpi_dates[0] if kpi_dates else min_date
+kpi_end = kpi_dates[1] if len(kpi_dates) > 1 else max_date
+# Month bounds let DuckDB skip archived lake partitions outside the date range
+kpi_filter = "WHERE date BETWEEN ? AND ? AND month BETWEEN ? AND ?" + (" AND operator = ?" if kpi_operator else "")
+kpi_params = [kpi_start, kpi_end, kpi_start.strftime('%Y-%m'), kpi_end.strftime('%Y-%m')] + \
+    ([kpi_operator] if kpi_operator else [])
+
 # Main dashboard layout
 
 # Key Metrics Row
@@ -126,15 +141,37 @@ st.markdown("### 📊 Key Performance Indicators")
 
 col1, col2, col3, col4 = st.columns(4)
 
+approx_kpis = None
+if approx_mode:
+    try:
+        # The full range is left unbounded, the entry prewarm() fills
+        approx_kpis = get_approximate_kpis(get_connection_pool().snapshot, kpi_operator,
+                                           kpi_start if kpi_start > min_date else None,
+                                           kpi_end if kpi_end < max_date else None)
+    except Exception as e:
+        st.warning(f"Approximate mode unavailable, showing exact values: {e}")
+
 with col1:
-    total_complaints_result = safe_db_query("SELECT COUNT(*) FROM customer_complaints")
-    total_complaints = total_complaints_result[0][0] if total_complaints_result else 0
-    st.metric("Total Complaints", f"{total_complaints:,}")
+    if approx_kpis:
+        st.metric("Total Complaints", f"{approx_kpis['total_complaints']:,}")
+        st.caption(f"≈ {approx_kpis['distinct_complaints']:,.0f} distinct IDs "
+                   f"± {approx_kpis['distinct_complaints_error']:,.0f} (HyperLogLog, 1σ)")
+    else:
+        total_complaints_result = safe_db_query(
+            f"SELECT COUNT(*) FROM customer_complaints_history {kpi_filter}", params=kpi_params)
+        total_complaints = total_complaints_result[0][0] if total_complaints_result else 0
+        st.metric("Total Complaints", f"{total_complaints:,}")
 
 with col2:
-    avg_sentiment_result = safe_db_query("SELECT AVG(sentiment_score) FROM customer_complaints")
-    avg_sentiment = avg_sentiment_result[0][0] if avg_sentiment_result else 0.0
-    st.metric("Average Sentiment", f"{avg_sentiment:.3f}")
+    if approx_kpis:
+        st.metric("Average Sentiment", f"{approx_kpis['avg_sentiment']:.3f}")
+        st.caption(f"Median ≈ {approx_kpis['median_sentiment']:.3f}, P90 ≈ {approx_kpis['p90_sentiment']:.3f} "
+                   f"(± {approx_kpis['sentiment_error']:.4f})")
+    else:
+        avg_sentiment_result = safe_db_query(
+            f"SELECT AVG(sentiment_score) FROM customer_complaints_history {kpi_filter}", params=kpi_params)
+        avg_sentiment = avg_sentiment_result[0][0] if avg_sentiment_result and avg_sentiment_result[0][0] is not None else 0.0
+        st.metric("Average Sentiment", f"{avg_sentiment:.3f}")
 
 with col3:
     best_operator_result = safe_db_query("""
@@ -151,19 +188,29 @@ with col3:
         st.metric("Best Performer", "N/A", "0.0")
 
 with col4:
-    worst_category_result = safe_db_query("""
-        SELECT complaint_category, COUNT(*) 
-        FROM customer_complaints 
-        GROUP BY complaint_category 
-        ORDER BY COUNT(*) DESC 
-        LIMIT 1
-    """)
-    
-    if worst_category_result and len(worst_category_result) > 0:
-        worst_category = worst_category_result[0]
-        st.metric("Most Common Issue", worst_category[0])
+    if approx_kpis:
+        st.metric("Most Common Issue (≈)", approx_kpis['most_common_issue'])
+        st.caption(f"≈ {approx_kpis['most_common_issue_count']:,} complaints "
+                   f"(+{approx_kpis['count_error']:,.0f} max overcount, Count-Min)")
     else:
-        st.metric("Most Common Issue", "N/A")
+        worst_category_result = safe_db_query(f"""
+            SELECT complaint_category, COUNT(*) 
+            FROM customer_complaints_history 
+            {kpi_filter}
+            GROUP BY complaint_category 
+            ORDER BY COUNT(*) DESC 
+            LIMIT 1
+        """, params=kpi_params)
+        
+        if worst_category_result and len(worst_category_result) > 0:
+            worst_category = worst_category_result[0]
+            st.metric("Most Common Issue", worst_category[0])
+        else:
+            st.metric("Most Common Issue", "N/A")
+
+if approx_kpis:
+    st.caption(f"💬 Most repeated complaint text ≈ \"{approx_kpis['most_common_text']}\" "
+               f"({approx_kpis['most_common_text_count']:,} ± {approx_kpis['count_error']:,.0f})")
 
 # Operator Performance Comparison
 st.markdown("### 🏆 Operator Performance Comparison")
@@ -174,7 +221,7 @@ with col1:
     # Network Health Over Time
     health_data = safe_df_query("""
         SELECT operator, date, network_health_score 
-        FROM network_health_daily 
+        FROM network_health_daily_history 
         ORDER BY date
     """)
     
@@ -197,7 +244,7 @@ with col2:
     # Complaint Categories by Operator
     category_data = safe_df_query("""
         SELECT operator, complaint_category, COUNT(*) as count
-        FROM customer_complaints
+        FROM customer_complaints_history
         GROUP BY operator, complaint_category
     """)
     
@@ -214,13 +261,11 @@ with col2:
 # Geographic Analysis
 st.markdown("### 🗺️ Geographic Performance Analysis")
 
-geo_data = safe_df_query("""
-    SELECT governorate, operator, COUNT(*) as complaints, 
-           AVG(sentiment_score) as avg_sentiment
-    FROM customer_complaints
-    WHERE governorate != 'Unknown'
-    GROUP BY governorate, operator
-""")
+try:
+    geo_data, pivot_data = get_geo_slices(get_connection_pool().snapshot)
+except Exception as e:
+    st.warning(f"Geo cube query failed: {e}")
+    geo_data, pivot_data = pd.DataFrame(), pd.DataFrame()
 
 if not geo_data.empty:
     col1, col2 = st.columns(2)
@@ -242,9 +287,6 @@ if not geo_data.empty:
     with col2:
         # Complaint Distribution Heatmap
         try:
-            pivot_data = geo_data.pivot_table(
-                index='governorate', columns='operator', values='complaints', fill_value=0
-            )
             fig = px.imshow(pivot_data, 
                            title="🔥 Complaint Distribution Heatmap",
                            aspect="auto",
@@ -253,15 +295,101 @@ if not geo_data.empty:
             st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.info("Not enough data for heatmap visualization")
+    
+    # Governorate drill-down from the cube
+    drill_governorate = st.selectbox("🔎 Drill down into governorate", sorted(geo_data['governorate'].unique()))
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        drill_categories = safe_df_query("""
+            SELECT operator, complaint_category, SUM(complaints) as complaints
+            FROM geo_cube
+            WHERE grouping_id = 0 AND governorate = ?
+            GROUP BY operator, complaint_category
+        """, params=[drill_governorate])
+        if not drill_categories.empty:
+            fig = px.bar(drill_categories, x='complaint_category', y='complaints', color='operator',
+                         title=f"📋 Complaint Categories - {drill_governorate}",
+                         barmode='stack',
+                         color_discrete_map={
+                             'vodafone': '#E60000',
+                             'orange': '#FF6600',
+                             'etisalat': '#00A1E9',
+                             'we': '#800080'
+                         })
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        drill_sentiment = safe_df_query("""
+            SELECT week, sentiment_p10 as p10, sentiment_p25 as p25, sentiment_p50 as median,
+                   sentiment_p75 as p75, sentiment_p90 as p90
+            FROM geo_cube
+            WHERE grouping_id = 3 AND governorate = ?
+            ORDER BY week
+        """, params=[drill_governorate])
+        if not drill_sentiment.empty:
+            fig = px.line(drill_sentiment, x='week', y=['p10', 'p25', 'median', 'p75', 'p90'],
+                          title=f"😊 Weekly Sentiment Percentiles - {drill_governorate}",
+                          labels={'value': 'Sentiment Score', 'week': 'Week', 'variable': 'Percentile'})
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
 else:
     st.info("No geographic data available")
 
+# What-if health scoring over the precomputed daily aggregates
+with st.expander("🧪 What-if Health Scoring"):
+    st.caption("Rescore every operator-day with different weights and rating bands without touching raw complaints")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        volume_weight = st.slider("Complaint volume weight", -100.0, 0.0, -50.0, 5.0)
+    with col2:
+        sentiment_weight = st.slider("Sentiment weight", 0.0, 50.0, 25.0, 1.0)
+    with col3:
+        engagement_weight = st.slider("Engagement (likes) weight", 0.0, 20.0, 5.0, 0.5)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        excellent_min = st.number_input("Excellent from", 0.0, 100.0, 80.0, 5.0)
+    with col2:
+        good_min = st.number_input("Good from", 0.0, 100.0, 60.0, 5.0)
+    with col3:
+        fair_min = st.number_input("Fair from", 0.0, 100.0, 40.0, 5.0)
+    
+    try:
+        daily_aggregates = get_daily_aggregates(get_connection_pool().snapshot)
+    except Exception as e:
+        st.warning(f"Daily aggregates unavailable: {e}")
+        daily_aggregates = pd.DataFrame()
+    
+    if not daily_aggregates.empty:
+        scorer = HealthScorer().with_weights(
+            daily_complaints=volume_weight, avg_sentiment=sentiment_weight, avg_likes=engagement_weight,
+            rating_bands=[(excellent_min, 'Excellent'), (good_min, 'Good'), (fair_min, 'Fair')]
+        )
+        rescored = scorer.what_if(daily_aggregates)
+        
+        fig = px.line(rescored, x='date', y='network_health_score', color='operator',
+                     title="📈 Rescored Network Health",
+                     labels={'network_health_score': 'Health Score', 'date': 'Date'})
+        st.plotly_chart(fig, use_container_width=True)
+        
+        summary = rescored.groupby('operator', observed=True).agg(
+            avg_health_score=('network_health_score', 'mean'),
+            days=('network_health_score', 'size')
+        )
+        rating_days = pd.crosstab(rescored['operator'], rescored['performance_rating'])
+        st.dataframe(summary.join(rating_days).round(2), use_container_width=True)
+    else:
+        st.info("No daily health data available for rescoring")
+
 # Recent Complaints Section
 st.markdown("### 📝 Recent Customer Complaints")
 
 recent_complaints = safe_df_query("""
     SELECT operator, complaint_text, complaint_category, sentiment_score, date, governorate
-    FROM customer_complaints
+    FROM customer_complaints_history
     ORDER BY date DESC, collection_timestamp DESC
     LIMIT 15
 """)
@@ -289,7 +417,7 @@ if selected_operator != "All":
     st.markdown(f"### 🔍 Deep Dive: {selected_operator.upper()}")
     
     op_data = safe_df_query(f"""
-        SELECT * FROM network_health_daily 
+        SELECT * FROM network_health_daily_history 
         WHERE operator = '{selected_operator}'
         ORDER BY date
     """)
@@ -319,7 +447,7 @@ st.sidebar.markdown("---")
 st.sidebar.markdown("### 📋 Data Status")
 
 # Check table existence and row counts
-tables_to_check = ['customer_complaints', 'network_health_daily', 'operator_benchmarks']
+tables_to_check = ['customer_complaints', 'network_health_daily', 'operator_benchmarks', 'quarantined_rows']
 for table in tables_to_check:
     try:
         count_result = safe_db_query(f"SELECT COUNT(*) FROM {table}")